@@ -1,5 +1,16 @@
 from .artist import Artist, get_artist_name_from_url, get_url_from_artist_name, get_url_from_group_name, get_url_from_series_name
-from .config import Config
-from .doujinshi import Doujinshi
-from .navigator import generate_url, Navigator, DoujinIterator, download_doujin, DoujinPage
+from .config import Config, Filters, STATE_KEYS
+from .doujinshi import Doujinshi, get_gallery_id_from_url
+from .navigator import generate_url, get_page_url, Navigator, DoujinIterator, download_doujin, DoujinPage
+from .api import HttpNavigator, HttpDoujinIterator
+from .nozomi import NozomiIndex, parse_nozomi
+from .backend import BACKENDS, create_navigator, create_iterator
 from .logger import Logger
+from .pool import NavigatorPool
+from .cache import PageCache
+from .matching import CompiledFilters, MatchResult, INCLUDE, EXCLUDE, UNDECIDED, LIST_PAGE_FIELDS
+from .query import QueryPlan
+from .store import GalleryStore, ArtistStore, ArtistVerdict, get_filters_fingerprint
+from .catalog import GalleryCatalog, CatalogQuery
+from .state import SearchState, StoredSet, StoredGallerySet, CrawlCursor
+from .seen import GallerySet, to_gallery_id
@@ -0,0 +1,241 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from os import getenv
+import json
+import re
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import PageCache
+from .doujinshi import Doujinshi, get_gallery_id_from_url
+from .logger import Logger
+from .nozomi import NozomiIndex, get_nozomi_paths
+from .prefetch import PagePrefetcher
+
+
+# Site with the static gallery data, set 'HITOMI_LTN_URL' to use a local stand-in server
+LTN_URL = getenv("HITOMI_LTN_URL", "https://ltn.hitomi.la").rstrip("/")
+SITE_URL = "https://hitomi.la"
+# Same number of doujin the site shows in each search page
+PAGE_SIZE = 25
+# Names the site shows for the types in the gallery data
+TYPE_NAMES = {
+    "artistcg": "artist cg",
+    "gamecg": "game cg",
+    "imageset": "image set",
+}
+
+
+def parse_gallery_date(raw_date: str) -> datetime:
+    """
+    Convert a gallery data date (2017-09-30 23:14:00-06) to local time,
+    the same way the site shows it
+    """
+    if re.search(r"[+-]\d\d$", raw_date):
+        raw_date += "00"
+    date = datetime.strptime(raw_date, "%Y-%m-%d %H:%M:%S%z")
+    return date.astimezone().replace(tzinfo=None)
+
+
+def gallery_info_to_doujinshi(info: dict) -> Doujinshi:
+    def get_names(key: str, name_key: str):
+        return [str(entry[name_key]).lower() for entry in info.get(key) or []]
+
+    doujin = Doujinshi()
+    doujin.name = info["title"]
+    if info.get("galleryurl"):
+        doujin.url = f"{SITE_URL}{info['galleryurl']}"
+    else:
+        doujin.url = f"{SITE_URL}/galleries/{info['id']}.html"
+    type = str(info.get("type", "")).lower()
+    doujin.type = TYPE_NAMES.get(type, type)
+    doujin.artists = get_names("artists", "artist")
+    doujin.groups = get_names("groups", "group")
+    doujin.series = get_names("parodys", "parody")
+    doujin.characters = get_names("characters", "character")
+    for tag in info.get("tags") or []:
+        name = str(tag["tag"]).lower()
+        if str(tag.get("female", "")) == "1":
+            name += " ♀"
+        elif str(tag.get("male", "")) == "1":
+            name += " ♂"
+        doujin.tags.append(name)
+    doujin.date = parse_gallery_date(info["date"])
+    return doujin
+
+
+class HttpNavigator:
+    """
+    Loads the site's static gallery data without a browser
+    """
+
+    def __init__(self, max_connections=8, cache: PageCache | None = None):
+        self.max_connections = max_connections
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections,
+                              pool_maxsize=max_connections,
+                              max_retries=3)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Referer"] = f"{SITE_URL}/"
+        self.executor = ThreadPoolExecutor(max_workers=max_connections,
+                                           thread_name_prefix="http")
+        # Gallery ids of the searches already made
+        self.search_results: dict[tuple[str, int], list[int]] = {}
+        self.index = NozomiIndex(self.get_if_exists)
+
+    def __del__(self):
+        self.quit()
+
+    def quit(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    def get(self, path: str) -> bytes:
+        url = f"{LTN_URL}/{path}"
+        if self.cache is not None:
+            content = self.cache.get(url)
+            if content is not None:
+                return content
+        response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        if self.cache is not None:
+            self.cache.put(url, response.content)
+        return response.content
+
+    def get_if_exists(self, path: str) -> bytes | None:
+        """
+        Same as `get`, but None if the site doesn't have it (tags or galleries that don't exist)
+        """
+        try:
+            return self.get(path)
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+            return None
+
+    def can_load_url(self, url: str):
+        include, _ = get_nozomi_paths(url)
+        try:
+            self.get(include[0])
+            return True
+        except requests.HTTPError:
+            return False
+
+    def search(self, url: str, min_gallery_id=0) -> list[int]:
+        """
+        Ids of all galleries that are listed in `url` above `min_gallery_id`, newest first
+        """
+        key = (url, min_gallery_id)
+        if key not in self.search_results:
+            self.search_results[key] = self.index.search(url, min_gallery_id).tolist()
+        return self.search_results[key]
+
+    def load_gallery_info(self, gallery_id: int) -> dict:
+        data = self.get(f"galleries/{gallery_id}.js").decode("utf-8")
+        # var galleryinfo = {...}
+        return json.loads(data[data.index("=") + 1:])
+
+    def _load_listed_gallery_info(self, gallery_id: int) -> dict | None:
+        try:
+            return self.load_gallery_info(gallery_id)
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+            # Listed but removed from the site
+            Logger.log_warn(f"No gallery data for {gallery_id}, skipping it\n")
+            return None
+
+    def load_doujin(self, url: str) -> Doujinshi:
+        doujin = gallery_info_to_doujinshi(
+            self.load_gallery_info(get_gallery_id_from_url(url)))
+        doujin.url = url
+        return doujin
+
+    def load_doujin_list(self, gallery_ids: list[int]) -> list[Doujinshi]:
+        infos = self.executor.map(self._load_listed_gallery_info, gallery_ids)
+        return [gallery_info_to_doujinshi(info) for info in infos if info is not None]
+
+    def load_extra_doujin_info(self, doujin: Doujinshi) -> bool:
+        # The gallery data already has all the info
+        return True
+
+    def open_new_tab(self):
+        # Pages are not rendered, so there are no tabs to manage
+        pass
+
+    def close_tab(self):
+        pass
+
+
+class HttpDoujinIterator():
+    def __init__(self, navigator: HttpNavigator, url: str, prefetch_pages=0, min_gallery_id=0):
+        self.navigator = navigator
+        self.url = url
+        # Only galleries with a higher id are listed, so the ones checked by past searches
+        # are left out before their data is loaded (0 to list all of them)
+        self.min_gallery_id = min_gallery_id
+        # Number of pages loaded ahead in the background (0 to disable)
+        self.prefetch_pages = prefetch_pages
+        self.gallery_ids: list[int] = []
+        self.num_pages: int | None = None
+        # Number of the page being iterated
+        self.page_num = 0
+        self.doujin_list: tuple[Doujinshi, ...] = ()
+        self.prefetcher: PagePrefetcher[tuple[int, tuple[Doujinshi, ...]]] | None = None
+
+    def get_extra_doujin_info(self, doujin: Doujinshi):
+        self.navigator.load_extra_doujin_info(doujin)
+
+    def search(self):
+        self.gallery_ids = self.navigator.search(self.url, self.min_gallery_id)
+        self.num_pages = (len(self.gallery_ids) + PAGE_SIZE - 1) // PAGE_SIZE
+        Logger.log(
+            f"{len(self.gallery_ids)} doujin in {self.num_pages} pages\n")
+
+    def load_doujin_list(self, page_num: int) -> tuple[Doujinshi, ...]:
+        if self.num_pages is None:
+            self.search()
+        return self.load_page(page_num)
+
+    def load_page(self, page_num: int) -> tuple[Doujinshi, ...]:
+        start = (page_num - 1) * PAGE_SIZE
+        page_ids = self.gallery_ids[start:start + PAGE_SIZE]
+        Logger.log(f"Page {page_num}/{self.num_pages}\n")
+        return tuple(self.navigator.load_doujin_list(page_ids))
+
+    def load_pages(self, start_page=1):
+        assert self.num_pages is not None
+        for page_num in range(start_page, self.num_pages + 1):
+            yield page_num, self.load_page(page_num)
+
+    def next(self, start_page=1):
+        self.search()
+        pages = self.load_pages(start_page)
+        if self.prefetch_pages > 0:
+            self.prefetcher = PagePrefetcher(
+                lambda: self.load_pages(start_page), self.prefetch_pages)
+            pages = iter(self.prefetcher)
+        try:
+            for page_num, doujin_list in pages:
+                self.page_num = page_num
+                self.doujin_list = doujin_list
+                for i, doujin in enumerate(self.doujin_list):
+                    if i == 0:
+                        Logger.log(f"{doujin.date}\n")
+                    yield (i, doujin)
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Stop loading pages ahead
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+            self.prefetcher = None
+
+    def is_last_of_page(self, i: int) -> bool:
+        return i == len(self.doujin_list) - 1
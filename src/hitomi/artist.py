@@ -23,8 +23,12 @@ def get_url_from_artist_name(name: str) -> str:
 
 
 class Artist:
-    def __init__(self, url: str):
-        self.name = get_artist_name_from_url(url)
+    __slots__ = ["name", "url"]
+
+    def __init__(self, url: str, name: str | None = None):
+        if name is None:
+            name = get_artist_name_from_url(url)
+        self.name = name
         self.url = url
 
     def __str__(self):
@@ -46,5 +50,5 @@ class Artist:
     def fromJSON(cls, json_data: dict):
         if len(json_data.keys()) == 0:
             return None
-        artist = Artist(json_data["url"])
+        artist = Artist(json_data["url"], json_data.get("name"))
         return artist
@@ -0,0 +1,29 @@
+from .api import HttpDoujinIterator, HttpNavigator
+from .cache import PageCache
+from .navigator import DoujinIterator, Navigator
+
+
+BACKENDS = ["browser", "http"]
+
+
+def create_navigator(backend: str,
+                     load_images=False,
+                     cache: PageCache | None = None) -> Navigator | HttpNavigator:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', use one of {BACKENDS}")
+    if backend == "http":
+        return HttpNavigator(cache=cache)
+    return Navigator(load_images, cache=cache)
+
+
+def create_iterator(navigator: Navigator | HttpNavigator,
+                    url: str,
+                    prefetch_pages=0,
+                    min_gallery_id=0) -> DoujinIterator | HttpDoujinIterator:
+    """
+    With `min_gallery_id` the http backend only lists newer galleries,
+    search pages of the browser can't leave the older ones out
+    """
+    if isinstance(navigator, HttpNavigator):
+        return HttpDoujinIterator(navigator, url, prefetch_pages, min_gallery_id)
+    return DoujinIterator(navigator, url, prefetch_pages)
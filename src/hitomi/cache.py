@@ -0,0 +1,147 @@
+from hashlib import sha256
+from pathlib import Path
+from time import time
+from urllib.parse import unquote, urldefrag
+import re
+import threading
+
+from .database import open_database
+from .logger import Logger
+
+
+# Types of pages, each one with its own time to live
+PAGE_KINDS = ["gallery", "artist", "search"]
+# Hours pages of each kind are kept (None for forever, 0 to not cache them)
+DEFAULT_TTL_HOURS: dict[str, float | None] = {
+    "gallery": None,
+    "artist": 24,
+    "search": 1,
+}
+
+
+def get_page_kind(url: str) -> str:
+    """
+    gallery: doujin pages and gallery data, they never change.
+    artist: artist, group and series pages and id lists.
+    search: homepage, search pages and the id lists used by them.
+    Searches inside an artist or group (search.html?artist:name ...) are artist pages too
+    """
+    if any(f"/{area}/" in url for area in ["artist", "group", "series"]):
+        return "artist"
+    if "search.html?" in url:
+        terms = unquote(urldefrag(url)[0].split("?", 1)[1]).split()
+        if any(term.startswith(("artist:", "group:")) for term in terms):
+            return "artist"
+    if "/galleries/" in url or re.search(r"\d+\.html$", url):
+        return "gallery"
+    return "search"
+
+
+class PageCache():
+    """
+    Page payloads saved on disk under the hash of their url.
+    Pages expire after the time to live of their kind and the least recently
+    used ones are removed when the cache grows over `max_bytes`
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, ttl_hours: dict[str, float | None] | None = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_hours = {**DEFAULT_TTL_HOURS, **(ttl_hours or {})}
+        self.hits = {kind: 0 for kind in PAGE_KINDS}
+        self.misses = {kind: 0 for kind in PAGE_KINDS}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = open_database(self.directory / "index.sqlite")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS pages (
+            key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created REAL NOT NULL,
+            accessed REAL NOT NULL)""")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed)")
+        self._db.commit()
+        self.size: int = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def _get_path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def _is_expired(self, kind: str, created: float) -> bool:
+        ttl = self.ttl_hours.get(kind)
+        return ttl is not None and time() - created > ttl * 3600
+
+    def _remove(self, key: str, size: int):
+        self._db.execute("DELETE FROM pages WHERE key = ?", (key,))
+        self._get_path(key).unlink(missing_ok=True)
+        self.size -= size
+
+    def get(self, url: str, kind: str | None = None) -> bytes | None:
+        if kind is None:
+            kind = get_page_kind(url)
+        key = sha256(url.encode("utf-8")).hexdigest()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, created FROM pages WHERE key = ?", (key,)).fetchone()
+            payload = None
+            if row is not None:
+                size, created = row
+                if self._is_expired(kind, created):
+                    self._remove(key, size)
+                else:
+                    try:
+                        payload = self._get_path(key).read_bytes()
+                        self._db.execute(
+                            "UPDATE pages SET accessed = ? WHERE key = ?", (time(), key))
+                    except FileNotFoundError:
+                        self._remove(key, size)
+                self._db.commit()
+            if payload is None:
+                self.misses[kind] += 1
+            else:
+                self.hits[kind] += 1
+            return payload
+
+    def put(self, url: str, payload: bytes, kind: str | None = None):
+        if kind is None:
+            kind = get_page_kind(url)
+        if self.ttl_hours.get(kind, None) == 0:
+            return
+        key = sha256(url.encode("utf-8")).hexdigest()
+        path = self._get_path(key)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.size -= row[0]
+            path.parent.mkdir(exist_ok=True)
+            path.write_bytes(payload)
+            now = time()
+            self._db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, url, kind, len(payload), now, now))
+            self.size += len(payload)
+            if self.size > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        # Leave some room so it doesn't evict on every new page
+        target_size = self.max_bytes * 0.9
+        rows = self._db.execute(
+            "SELECT key, size FROM pages ORDER BY accessed").fetchall()
+        for key, size in rows:
+            if self.size <= target_size:
+                break
+            self._remove(key, size)
+
+    def log_stats(self):
+        stats = ", ".join(f"{kind} {self.hits[kind]} hits/{self.misses[kind]} misses"
+                          for kind in PAGE_KINDS)
+        Logger.log(
+            f"Page cache: {stats} ({self.size / 2**20:.1f} MB on disk)\n")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
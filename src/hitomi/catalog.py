@@ -0,0 +1,158 @@
+from pathlib import Path
+from typing import Iterable
+import threading
+
+from .database import LIST_COLUMNS, GALLERY_COLUMNS, open_database, create_galleries_table, encode_gallery_row, decode_gallery_row
+from .doujinshi import Doujinshi, get_gallery_id_from_url
+
+
+# Search areas of a query and the column they look in ("artist:name", "female:tag")
+QUERY_AREAS = {
+    "artist": "artists",
+    "group": "groups",
+    "series": "series",
+    "character": "characters",
+    "tag": "tags",
+    "female": "tags",
+    "male": "tags",
+}
+
+
+class CatalogQuery():
+    """
+    Query in the same format as the site's search: "artist:name tag:big_tag some title words".
+    Underscores in names are spaces, the words without an area are searched in the titles
+    """
+
+    def __init__(self, text: str = ""):
+        self.names: list[tuple[str, str]] = []
+        self.type = ""
+        self.title_words: list[str] = []
+        # Only the included (True) or excluded (False) doujin, or both
+        self.included: bool | None = None
+
+        for word in text.split():
+            area, _, name = word.partition(":")
+            name = name.replace("_", " ")
+            if not name or (area not in QUERY_AREAS and area != "type"):
+                self.title_words.append(word)
+            elif area == "type":
+                self.type = name
+            elif area == "female":
+                self.names.append(("tags", f"{name} ♀"))
+            elif area == "male":
+                self.names.append(("tags", f"{name} ♂"))
+            else:
+                self.names.append((QUERY_AREAS[area], name))
+
+
+class GalleryCatalog():
+    """
+    Every doujin found by past searches, with an index of the galleries of each tag, artist,
+    group, series and character and a full text index of the titles,
+    so they can be looked up without searching the site again
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = open_database(path)
+        # Same as the gallery store's, with whether the last search included them
+        create_galleries_table(self._db, ["included INTEGER"])
+        # Inverted index, the galleries with each name
+        self._db.execute("""CREATE TABLE IF NOT EXISTS names (
+            field TEXT NOT NULL,
+            name TEXT NOT NULL,
+            gallery_id INTEGER NOT NULL,
+            PRIMARY KEY (field, name, gallery_id)) WITHOUT ROWID""")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS names_by_gallery ON names (gallery_id)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS galleries_by_date ON galleries (date)")
+        # Titles with the gallery id as rowid
+        self._db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS titles USING fts5 (name, tokenize = 'unicode61 remove_diacritics 2')")
+        self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM galleries").fetchone()[0]
+
+    def _add(self, doujin: Doujinshi, included: bool | None):
+        row = encode_gallery_row(doujin)
+        gallery_id = row[0]
+        self._db.execute(
+            f"""INSERT OR REPLACE INTO galleries (id, {', '.join(GALLERY_COLUMNS)}, included, updated)
+            VALUES ({', '.join('?' * len(row))}, ?, julianday('now'))""",
+            (*row, None if included is None else int(included)))
+        self._db.execute(
+            "DELETE FROM names WHERE gallery_id = ?", (gallery_id,))
+        self._db.executemany(
+            "INSERT OR IGNORE INTO names (field, name, gallery_id) VALUES (?, ?, ?)",
+            [(column, name, gallery_id) for column in LIST_COLUMNS for name in getattr(doujin, column)])
+        self._db.execute("DELETE FROM titles WHERE rowid = ?", (gallery_id,))
+        self._db.execute("INSERT INTO titles (rowid, name) VALUES (?, ?)",
+                         (gallery_id, doujin.name))
+
+    def add(self, doujin: Doujinshi, included: bool | None = None):
+        """
+        Save `doujin`, replacing the info of its gallery if it was already saved
+        """
+        self.add_all([doujin], included)
+
+    def add_all(self, doujin_list: Iterable[Doujinshi], included: bool | None = None):
+        with self._lock:
+            for doujin in doujin_list:
+                try:
+                    self._add(doujin, included)
+                except ValueError:
+                    # Not a gallery url
+                    continue
+            self._db.commit()
+
+    def set_included(self, doujin_list: Iterable[Doujinshi], included: bool):
+        """
+        Only change whether already saved doujin were included
+        """
+        with self._lock:
+            self._db.executemany("UPDATE galleries SET included = ? WHERE id = ?",
+                                 [(int(included), get_gallery_id_from_url(doujin.url)) for doujin in doujin_list])
+            self._db.commit()
+
+    def search(self, query: CatalogQuery, limit: int | None = None) -> list[Doujinshi]:
+        """
+        Doujin that have all the names and title words of `query`, newest first
+        """
+        conditions: list[str] = []
+        parameters: list = []
+        for column, name in query.names:
+            conditions.append(
+                "id IN (SELECT gallery_id FROM names WHERE field = ? AND name = ?)")
+            parameters.extend([column, name])
+        if query.type:
+            conditions.append("type = ?")
+            parameters.append(query.type)
+        if len(query.title_words) > 0:
+            conditions.append(
+                "id IN (SELECT rowid FROM titles WHERE titles MATCH ?)")
+            # Each word quoted so it isn't read as fts syntax, and matched as a prefix
+            parameters.append(" ".join(
+                '"' + word.replace('"', '""') + '"*' for word in query.title_words))
+        if query.included is not None:
+            conditions.append("included = ?")
+            parameters.append(int(query.included))
+        where = f"WHERE {' AND '.join(conditions)}" if len(conditions) > 0 else ""
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT ?"
+            parameters.append(limit)
+        with self._lock:
+            rows = self._db.execute(
+                f"""SELECT {', '.join(GALLERY_COLUMNS)} FROM galleries
+                {where} ORDER BY date DESC {limit_clause}""",
+                parameters).fetchall()
+        return [decode_gallery_row(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,6 +1,12 @@
 from datetime import datetime
 
 from .logger import Logger
+from .seen import GallerySet
+
+
+# Config values that change during a search, they are kept in the search state instead of config.json
+STATE_KEYS = ["seen_doujinshi", "unread_series",
+              "stop_datetime", "stop_title", "search_is_incomplete"]
 
 
 def set_correct_data(obj: object, key: str, data):
@@ -13,8 +19,10 @@ def set_correct_data(obj: object, key: str, data):
     correct_data = None
     if correct_type == datetime:
         correct_data = datetime.strptime(data, '%d/%m/%Y %H:%M')
-    if correct_type == set:
+    elif correct_type == set:
         correct_data = set(data)
+    elif correct_type == GallerySet:
+        correct_data = GallerySet(data)
     elif correct_type == int:
         correct_data = int(data)
     else:
@@ -83,6 +91,7 @@ class Filters():
                 Logger.log_warn(f"Unknown filter key '{key}', skipping...\n")
                 continue
             set_correct_data(filters, key, json_data[key])
+        return filters
 
 
 class Config():
@@ -94,12 +103,15 @@ class Config():
         self.unread_series: set[str] = set()
         # All the artist an user has favorited, taken from the browser's bookmarks
         self.added_artists: set[str] = set()
-        # All doujin titles seen in the currect search
-        self.seen_doujinshi: set[str] = set()
+        # Gallery ids of all doujin seen in the currect search
+        self.seen_doujinshi = GallerySet()
         # Datetime of the latest doujin in the last search
         self.stop_datetime: datetime = datetime(1999, 1, 1)
         # If true ignores the stop datetime and keeps searching everything
         self.search_all = False
+        # If true only checks doujin uploaded after the last finished search with the same filters,
+        # the ones with a higher gallery id. Unlike the stop datetime it works for every search
+        self.incremental_sync = False
         # Title of the latest doujin where the last search ended on
         self.stop_title = ""
         # Whether the last search was incomplete, if true the search will resume
@@ -107,10 +119,38 @@ class Config():
         # Whether to search for artists that fit the user's preferences as well as doujin
         # Set to false to speed up doujin search
         self.check_artist = True
+        # Number of browsers checking artists and groups while the search goes on
+        # (Use 0 to check them one at a time in the search's browser)
+        self.num_workers = 2
+        # How pages are loaded: 'browser' renders them with selenium,
+        # 'http' downloads the site's gallery data without a browser
+        self.backend = "browser"
+        # Number of search pages loaded in the background ahead of the one being checked
+        # (Use 0 to load them only when needed, null for 1 with the http backend and 0 with the browser,
+        # where they are loaded in a second browser)
+        self.prefetch_pages: int | None = None
+        # Max number of pages, doujin info and artists loaded at the same time with --async
+        self.max_concurrency = 4
+        # Max size of the pages kept on disk between searches
+        # (Use 0 to disable the cache)
+        self.cache_max_megabytes = 1024
+        # Hours pages are kept in the cache for each kind of page: gallery, artist and search
+        # (Use null to keep them forever, 0 to not cache them)
+        self.cache_ttl_hours: dict[str, float | None] = {
+            "gallery": None,
+            "artist": 24,
+            "search": 1,
+        }
+
+    def get_prefetch_pages(self) -> int:
+        if self.prefetch_pages is None:
+            return 1 if self.backend == "http" else 0
+        return self.prefetch_pages
 
     def toJSON(self):
-        my_dict = dict(self.__dict__)
-        for attrib_name in self.__dict__:
+        my_dict = {key: value for key, value in self.__dict__.items()
+                   if key not in STATE_KEYS}
+        for attrib_name in my_dict:
             attrib = getattr(self, attrib_name)
             if isinstance(attrib, Filters):
                 my_dict[attrib_name] = attrib.toJSON()
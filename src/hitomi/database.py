@@ -0,0 +1,58 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Sequence
+import json
+import sqlite3
+
+from .doujinshi import Doujinshi, get_gallery_id_from_url
+
+
+# Columns holding lists, saved as json
+LIST_COLUMNS = ["artists", "groups", "series", "characters", "tags"]
+# Columns of a doujin in the galleries tables, after its gallery id
+GALLERY_COLUMNS = ["url", "name", "type", *LIST_COLUMNS, "date"]
+
+
+def open_database(path: Path) -> sqlite3.Connection:
+    """
+    Connection shared by all threads (each store guards it with its own lock),
+    in WAL mode so a killed search doesn't corrupt it
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    return db
+
+
+def create_galleries_table(db: sqlite3.Connection, extra_columns: Sequence[str] = ()):
+    """
+    Table with a row for each doujin under its gallery id, `extra_columns` are column definitions
+    """
+    columns = ",\n    ".join(["id INTEGER PRIMARY KEY",
+                              *(f"{column} TEXT NOT NULL" for column in GALLERY_COLUMNS),
+                              *extra_columns,
+                              "updated REAL NOT NULL"])
+    db.execute(f"CREATE TABLE IF NOT EXISTS galleries (\n    {columns})")
+
+
+def encode_gallery_row(doujin: Doujinshi) -> tuple:
+    """
+    Gallery id and GALLERY_COLUMNS of `doujin`
+    """
+    lists = [json.dumps(getattr(doujin, column), ensure_ascii=False)
+             for column in LIST_COLUMNS]
+    return (get_gallery_id_from_url(doujin.url), doujin.url, doujin.name, doujin.type,
+            *lists, doujin.date.isoformat())
+
+
+def decode_gallery_row(row: Sequence) -> Doujinshi:
+    """
+    Doujin in a row with the GALLERY_COLUMNS
+    """
+    doujin = Doujinshi()
+    doujin.url, doujin.name, doujin.type = row[:3]
+    for column, value in zip(LIST_COLUMNS, row[3:-1]):
+        setattr(doujin, column, json.loads(value))
+    doujin.date = datetime.fromisoformat(row[-1])
+    return doujin
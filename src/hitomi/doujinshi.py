@@ -1,11 +1,45 @@
 from datetime import datetime
 import urllib.parse
+import re
 
-from .config import Filters
 from .logger import Logger
 
 
+# Format of the dates in the json files (01 Jan 2020, 18:30)
+DATE_FORMAT = "%d %b %Y, %H:%M"
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+               "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+MONTH_NUMBERS = {name: i + 1 for i, name in enumerate(MONTH_NAMES)}
+
+
+def format_date(date: datetime) -> str:
+    return f"{date.day:02d} {MONTH_NAMES[date.month - 1]} {date.year:04d}, {date.hour:02d}:{date.minute:02d}"
+
+
+def parse_date(text: str) -> datetime:
+    if len(text) == 18 and text[3:6] in MONTH_NUMBERS:
+        try:
+            return datetime(int(text[7:11]), MONTH_NUMBERS[text[3:6]], int(text[0:2]),
+                            int(text[13:15]), int(text[16:18]))
+        except ValueError:
+            pass
+    return datetime.strptime(text, DATE_FORMAT)
+
+
+def get_gallery_id_from_url(url: str) -> int:
+    """
+    Get the number at the end of a gallery url (https://hitomi.la/doujinshi/title-japanese-123456.html)
+    """
+    match = re.search(r"(\d+)\.html", url)
+    if match is None:
+        raise ValueError(f"No gallery id in {url}")
+    return int(match.group(1))
+
+
 class Doujinshi:
+    __slots__ = ["url", "name", "type", "groups", "artists", "series",
+                 "characters", "tags", "date", "exclude_reasons"]
+
     def __init__(self):
         self.url = ""
         self.name = ""
@@ -50,99 +84,53 @@ class Doujinshi:
         '''
         return len(self.artists) > 2
 
-    def matches(self, filter: Filters) -> bool:
-        '''
-        Check if doujin passes all filters set by the Config
-        '''
-        def CommonItems(lst, items):
-            common = []
-            for item in items:
-                for element in lst:
-                    if item == element:
-                        common.append(item)
-                        break
-            return common
-
-        def MissingItems(lst, items):
-            missing = []
-            for item in items:
-                is_included = False
-                for element in lst:
-                    if item == element:
-                        is_included = True
-                        break
-                if not is_included:
-                    missing.append(item)
-            return missing
-
-        can_add = True
-
-        is_forbidden_type = any(
-            t == self.type for t in filter.must_exclude_type)
-        if is_forbidden_type:
-            can_add = False
-            self.exclude_reasons.append(f"Is of type {self.type}")
-
-        forbidden_tags = CommonItems(self.tags, filter.must_exclude_tags)
-        if len(forbidden_tags) > 0:
-            can_add = False
-            self.exclude_reasons.append(f"Contains tags {forbidden_tags}")
-
-        missing_tags = MissingItems(self.tags, filter.must_include_tags)
-        if len(missing_tags) > 0:
-            can_add = False
-            self.exclude_reasons.append(f"Doesn't contain tags {missing_tags}")
-
-        if filter.must_include_series:
-            includes_series = False
-            for name in self.series:
-                if name == filter.must_include_series:
-                    includes_series = True
-            if not includes_series:
-                can_add = False
-                self.exclude_reasons.append(
-                    f"Doesn't contain series {filter.must_include_series}")
-
-        missing_characters = MissingItems(
-            self.characters, filter.must_include_characters)
-        if len(missing_characters) > 0:
-            can_add = False
-            self.exclude_reasons.append(
-                f"Doesn't contain characters {missing_characters}")
-
-        if filter.max_num_artists > 0 and len(self.artists) > filter.max_num_artists:
-            can_add = False
-            self.exclude_reasons.append(
-                f"More than {filter.max_num_artists} artists")
-
-        return can_add
-
     def toJSON(self):
-        # Don't modify original __dict__
-        my_dict = dict(self.__dict__)
-
-        # Remove empty entries
-        my_dict = {k: v for k, v in my_dict.items() if v}
-
-        my_dict['date'] = self.date.strftime('%d %b %Y, %H:%M')
-        return my_dict
+        # Empty entries are left out
+        json_data = {}
+        if self.url:
+            json_data["url"] = self.url
+        if self.name:
+            json_data["name"] = self.name
+        if self.type:
+            json_data["type"] = self.type
+        if self.groups:
+            json_data["groups"] = self.groups
+        if self.artists:
+            json_data["artists"] = self.artists
+        if self.series:
+            json_data["series"] = self.series
+        if self.characters:
+            json_data["characters"] = self.characters
+        if self.tags:
+            json_data["tags"] = self.tags
+        json_data["date"] = format_date(self.date)
+        if self.exclude_reasons:
+            json_data["exclude_reasons"] = self.exclude_reasons
+        return json_data
 
     @classmethod
     def fromJSON(cls, json_data: dict):
         if len(json_data.keys()) == 0:
             return None
 
-        doujinshi = Doujinshi()
-        for key in json_data:
-            if not hasattr(doujinshi, key):
+        if not DOUJINSHI_KEYS.issuperset(json_data):
+            for key in json_data.keys() - DOUJINSHI_KEYS:
                 Logger.log_warn(
                     f"Unknown doujinshi key '{key}', skipping...\n")
-                continue
-            data = json_data[key]
-            correct_type = type(getattr(doujinshi, key))
-            if correct_type == datetime:
-                setattr(doujinshi, key, datetime.strptime(
-                    data, '%d %b %Y, %H:%M'))
-            else:
-                setattr(doujinshi, key, data)
+        get = json_data.get
+        doujinshi = cls.__new__(cls)
+        doujinshi.url = get("url", "")
+        doujinshi.name = get("name", "")
+        doujinshi.type = get("type", "")
+        doujinshi.groups = get("groups") or []
+        doujinshi.artists = get("artists") or []
+        doujinshi.series = get("series") or []
+        doujinshi.characters = get("characters") or []
+        doujinshi.tags = get("tags") or []
+        date = get("date")
+        doujinshi.date = parse_date(date) if date else datetime(1900, 1, 1)
+        doujinshi.exclude_reasons = get("exclude_reasons") or []
         return doujinshi
+
+
+DOUJINSHI_KEYS = frozenset(Doujinshi.__slots__)
@@ -0,0 +1,138 @@
+from typing import Callable, Iterable
+
+from .config import Filters
+from .doujinshi import Doujinshi
+
+
+# Decisions of evaluating a doujin against the filters
+INCLUDE = "include"
+EXCLUDE = "exclude"
+UNDECIDED = "undecided"
+# Fields shown in search pages, the rest are only in the doujin's page
+LIST_PAGE_FIELDS = frozenset(
+    ["url", "name", "type", "artists", "series", "tags", "date"])
+
+
+class MatchResult():
+    def __init__(self,
+                 decision: str,
+                 missing_fields: list[str] | None = None,
+                 get_exclude_reasons: Callable[[], list[str]] | None = None):
+        self.decision = decision
+        # Fields that would settle an undecided doujin
+        self.missing_fields = missing_fields or []
+        # Reasons are only built if they are read
+        self._get_exclude_reasons = get_exclude_reasons
+        self._exclude_reasons: list[str] | None = None
+
+    @property
+    def exclude_reasons(self) -> list[str]:
+        if self._exclude_reasons is None:
+            self._exclude_reasons = []
+            if self._get_exclude_reasons is not None:
+                self._exclude_reasons = self._get_exclude_reasons()
+        return self._exclude_reasons
+
+
+class CompiledFilters():
+    """
+    Filters turned into sets once, so each doujin is matched with
+    set lookups instead of comparing every tag with every filter
+    """
+
+    def __init__(self, filters: Filters):
+        self.excluded_types = frozenset(filters.must_exclude_type)
+        self.included_tags = frozenset(filters.must_include_tags)
+        self.excluded_tags = frozenset(filters.must_exclude_tags)
+        self.series = filters.must_include_series
+        self.included_characters = frozenset(filters.must_include_characters)
+        self.max_num_artists = filters.max_num_artists
+        # Fields each filter needs, only the ones that are set
+        self.fields: frozenset[str] = frozenset(field for field, is_set in [
+            ("type", len(self.excluded_types) > 0),
+            ("tags", len(self.included_tags) + len(self.excluded_tags) > 0),
+            ("series", self.series != ""),
+            ("characters", len(self.included_characters) > 0),
+            ("artists", self.max_num_artists > 0),
+        ] if is_set)
+
+    def matches(self, doujin: Doujinshi) -> bool:
+        """
+        Check if doujin passes all filters
+        """
+        if doujin.type in self.excluded_types:
+            return False
+        if not self.excluded_tags.isdisjoint(doujin.tags):
+            return False
+        if not self.included_tags.issubset(doujin.tags):
+            return False
+        if self.series and self.series not in doujin.series:
+            return False
+        if not self.included_characters.issubset(doujin.characters):
+            return False
+        if self.max_num_artists > 0 and len(doujin.artists) > self.max_num_artists:
+            return False
+        return True
+
+    def match_batch(self, doujin_list: Iterable[Doujinshi]) -> list[bool]:
+        matches = self.matches
+        return [matches(doujin) for doujin in doujin_list]
+
+    def _matches_fields(self, doujin: Doujinshi, fields: Iterable[str]) -> bool:
+        for field in fields:
+            if field == "type" and doujin.type in self.excluded_types:
+                return False
+            if field == "tags" and (not self.excluded_tags.isdisjoint(doujin.tags)
+                                    or not self.included_tags.issubset(doujin.tags)):
+                return False
+            if field == "series" and self.series not in doujin.series:
+                return False
+            if field == "characters" and not self.included_characters.issubset(doujin.characters):
+                return False
+            if field == "artists" and len(doujin.artists) > self.max_num_artists:
+                return False
+        return True
+
+    def evaluate(self, doujin: Doujinshi, known_fields: frozenset[str] | set[str] | None = None) -> MatchResult:
+        """
+        Check the filters that only depend on `known_fields` (all fields if None).
+        The doujin is undecided if it passes them but other filters depend on fields that aren't known
+        """
+        if known_fields is None:
+            if self.matches(doujin):
+                return MatchResult(INCLUDE)
+            return MatchResult(EXCLUDE, get_exclude_reasons=lambda: self.get_exclude_reasons(doujin))
+        if not self._matches_fields(doujin, self.fields & known_fields):
+            return MatchResult(EXCLUDE, get_exclude_reasons=lambda: self.get_exclude_reasons(doujin, known_fields))
+        missing_fields = sorted(self.fields - known_fields)
+        if len(missing_fields) > 0:
+            return MatchResult(UNDECIDED, missing_fields=missing_fields)
+        return MatchResult(INCLUDE)
+
+    def get_exclude_reasons(self, doujin: Doujinshi, known_fields: frozenset[str] | set[str] | None = None) -> list[str]:
+        def is_known(field: str) -> bool:
+            return known_fields is None or field in known_fields
+
+        reasons: list[str] = []
+        if is_known("type") and doujin.type in self.excluded_types:
+            reasons.append(f"Is of type {doujin.type}")
+        if is_known("tags"):
+            forbidden_tags = [
+                tag for tag in self.excluded_tags if tag in doujin.tags]
+            if len(forbidden_tags) > 0:
+                reasons.append(f"Contains tags {forbidden_tags}")
+            missing_tags = [
+                tag for tag in self.included_tags if tag not in doujin.tags]
+            if len(missing_tags) > 0:
+                reasons.append(f"Doesn't contain tags {missing_tags}")
+        if is_known("series") and self.series and self.series not in doujin.series:
+            reasons.append(f"Doesn't contain series {self.series}")
+        if is_known("characters"):
+            missing_characters = [
+                character for character in self.included_characters if character not in doujin.characters]
+            if len(missing_characters) > 0:
+                reasons.append(
+                    f"Doesn't contain characters {missing_characters}")
+        if is_known("artists") and self.max_num_artists > 0 and len(doujin.artists) > self.max_num_artists:
+            reasons.append(f"More than {self.max_num_artists} artists")
+        return reasons
@@ -4,11 +4,13 @@ import sys
 from datetime import datetime
 from typing import Callable
 import urllib
+from urllib.parse import urldefrag
 import time
+import threading
+import json
 
 import selenium.common.exceptions as WebException
 from selenium import webdriver
-from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
@@ -20,42 +22,45 @@ from selenium.webdriver.support.select import Select
 from .doujinshi import Doujinshi
 from .logger import Logger
 from .config import Config
+from .cache import PageCache
+from .page_parser import parse_gallery_page
+from .prefetch import PagePrefetcher
+from .query import QueryPlan
 
 
-def generate_url(config: Config):
-    def tag_to_search_param(tag: str, exclude: bool):
-        string = ""
-        if "♀" in tag:
-            string = f"female%3A{tag.replace(' ♀', '')}"
-        elif "♂" in tag:
-            string = f"male%3A{tag.replace(' ♂', '')}"
-        else:
-            string = f"tag%3A{tag}"
-        return f"%20{'-' if exclude else ''}{string.replace(' ', '_')}"
+# Each browser needs its own remote debugging port
+FIRST_DEBUGGING_PORT = 9222
+_next_debugging_port = FIRST_DEBUGGING_PORT
+_debugging_port_lock = threading.Lock()
+
 
-    search_params = ""
-    if config.filters.must_include_series:
-        search_params += f"series%3A{config.filters.must_include_series.replace(' ', '_')}"
-    if config.filters.language:
-        search_params += f"language%3A{config.filters.language[1]}"
-    for type in config.filters.must_exclude_type:
-        search_params += f"%20-type%3A{type.replace(' ', '')}"
-    for include_tag in config.filters.must_include_tags:
-        search_params += tag_to_search_param(include_tag, False)
-    for exclude_tag in config.filters.must_exclude_tags:
-        search_params += tag_to_search_param(exclude_tag, True)
+def get_free_debugging_port() -> int:
+    global _next_debugging_port
+    with _debugging_port_lock:
+        port = _next_debugging_port
+        _next_debugging_port += 1
+        return port
 
-    base_url = "https://hitomi.la"
 
-    if len(search_params) > 0:
-        return f"{base_url}/search.html?{search_params}"
-    else:
-        return base_url
+def get_page_url(url: str, page_num: int) -> str:
+    """
+    Url of page `page_num` of a search, artist, group, series or the homepage
+    """
+    if page_num <= 1:
+        return url
+    if "search.html?" in url:
+        # Search pages keep the query and select the page with #page
+        return f"{urldefrag(url)[0]}#{page_num}"
+    return f"{url.split('?')[0]}?page={page_num}"
+
+
+def generate_url(config: Config):
+    return QueryPlan(config.filters).url
 
 
 class Navigator:
 
-    def __init__(self, load_images=False):
+    def __init__(self, load_images=False, debugging_port: int | None = None, cache: PageCache | None = None):
         options = Options()
         ADDBLOCK_PATH = getenv("ADDBLOCK_PATH")
         if ADDBLOCK_PATH and Path(ADDBLOCK_PATH).exists():
@@ -67,7 +72,9 @@ class Navigator:
         options.add_argument("--headless")
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--remote-debugging-port=9222")
+        if debugging_port is None:
+            debugging_port = get_free_debugging_port()
+        options.add_argument(f"--remote-debugging-port={debugging_port}")
         if not load_images:
             options.add_argument("--blink-settings=imagesEnabled=false")
             options.add_argument("--disable-gpu")
@@ -77,6 +84,7 @@ class Navigator:
         if getenv("BROWSER_NAME") == "brave":
             options.binary_location = str(
                 Path("C:/Program Files/BraveSoftware/Brave-Browser/Application/brave.exe"))
+        self.cache = cache
         self.browser: webdriver.Chrome | None = None
         try:
             self.browser = webdriver.Chrome(service=ChromeService(
@@ -94,12 +102,20 @@ class Navigator:
                 sys.exit()
         self.browser.create_options()
         self.wait = WebDriverWait(self.browser, 30)
+        # Tabs to go back to when closing the current one
+        self.previous_handles: list[str] = []
+        # Tab where doujin pages are loaded to get their extra info
+        self.detail_handle: str | None = None
         Logger.log("Created browser\n")
 
     def __del__(self):
+        self.quit()
+
+    def quit(self):
         if self.browser:
             Logger.log("Close browser\n")
             self.browser.quit()
+            self.browser = None
 
     def get_current_url(self):
         assert (self.browser != None)
@@ -107,46 +123,93 @@ class Navigator:
 
     def load(self, url: str):
         assert (self.browser != None)
+        previous_url = self.browser.current_url
         self.browser.get(url)
+        # Changing only the #page doesn't load the page again
+        if url != previous_url and urldefrag(url)[0] == urldefrag(previous_url)[0]:
+            self.browser.refresh()
 
     def refresh(self):
         assert (self.browser != None)
         self.browser.refresh()
 
+    def get_page_source(self) -> str:
+        assert (self.browser != None)
+        return self.browser.page_source
+
     def find(self, selector: str, type=By.CSS_SELECTOR, wait=False):
         assert (self.browser != None)
         if wait:
             return self.wait.until(EC.visibility_of_element_located((type, selector)))
         return self.browser.find_element(type, selector)
 
+    def execute_script(self, script: str, *args):
+        assert (self.browser != None)
+        return self.browser.execute_script(script, *args)
+
     def find_all(self, xpath: str, type=By.CSS_SELECTOR, wait=False):
         assert (self.browser != None)
         if wait:
             return self.wait.until(EC.presence_of_all_elements_located((type, xpath)))
         return self.browser.find_elements(type, xpath)
 
-    def __get_current_tab_index(self) -> int:
-        assert (self.browser != None)
-        for i, handle in enumerate(self.browser.window_handles):
-            if handle == self.browser.current_window_handle:
-                return i
-        raise (Exception("No current window handle"))
-
     def get_current_handle(self) -> str:
         assert (self.browser != None)
         return self.browser.current_window_handle
 
     def open_new_tab(self):
         assert (self.browser != None)
+        self.previous_handles.append(self.get_current_handle())
         self.browser.switch_to.new_window("tab")
 
     def close_tab(self):
+        """
+        Close the current tab and go back to the one that opened it
+        """
         assert (self.browser != None)
-        current_tab_index = self.__get_current_tab_index()
         self.browser.close()
-        current_tab_index = current_tab_index-1
-        self.browser.switch_to.window(
-            self.browser.window_handles[current_tab_index])
+        if len(self.previous_handles) > 0:
+            self.browser.switch_to.window(self.previous_handles.pop())
+            return
+        self.browser.switch_to.window(self.browser.window_handles[-1])
+
+    def load_detail_page(self, url: str):
+        """
+        Load a doujin page in a tab used only for them,
+        leaving the current tab as it is
+        """
+        assert (self.browser != None)
+        if self.cache is not None:
+            html = self.cache.get(url, "gallery")
+            if html is not None:
+                return DoujinPage(url, html=html.decode("utf-8"))
+        previous_handle = self.get_current_handle()
+        if self.detail_handle is None:
+            self.browser.switch_to.new_window("tab")
+            self.detail_handle = self.get_current_handle()
+        else:
+            self.browser.switch_to.window(self.detail_handle)
+        try:
+            doujin_page = DoujinPage(url, self)
+        finally:
+            self.browser.switch_to.window(previous_handle)
+        if self.cache is not None:
+            self.cache.put(url, doujin_page.html.encode("utf-8"), "gallery")
+        return doujin_page
+
+    def load_extra_doujin_info(self, doujin: Doujinshi) -> bool:
+        """
+        Add the groups and characters that search pages don't show.
+        Returns whether they could be loaded
+        """
+        try:
+            doujin_page = self.load_detail_page(doujin.url)
+            doujin.groups.extend(doujin_page.load_groups())
+            doujin.characters.extend(doujin_page.load_characters())
+            return True
+        except Exception as e:
+            Logger.log_warn(f"doujin info exception: {e}\n")
+            return False
 
     def can_load_url(self, url: str):
         assert (self.browser != None)
@@ -267,53 +330,50 @@ def ConvertDatetime(original_dt: str):
 
 
 class DoujinPage():
-    def __init__(self, url: str, navigator: Navigator):
+    def __init__(self, url: str, navigator: Navigator | None = None, html: str | None = None):
+        """
+        Load the page in `navigator`, or read it from `html` if it was already loaded
+        """
         self.url = url
         self.navigator = navigator
         self.doujin: Doujinshi | None = None
-        self.navigator.load(url)
-        # Wait until elements are loaded
-        try:
-            self.name = self.navigator.find("#gallery-brand", wait=True).text
-        except WebException.TimeoutException:
-            raise TimeoutError("Timeout loading doujin page")
+        if html is None:
+            assert (navigator != None)
+            navigator.load(url)
+            # Wait until elements are loaded
+            try:
+                navigator.find("#gallery-brand", wait=True)
+            except WebException.TimeoutException:
+                raise TimeoutError("Timeout loading doujin page")
+            html = navigator.get_page_source()
+        # Everything else is read from a single snapshot of the page
+        self.html = html
+        self.page = parse_gallery_page(html)
+        self.name = self.page.get_text("gallery-brand")
 
     def load_name(self):
         return self.name
 
     def load_type(self):
-        return self.navigator.find("#type").text.lower()
-
-    def _load_children_link_text(self, parent_id: str, blank_value: str):
-        """
-        Return the text of all links that are children to
-        the element with CSS id `parent_id`
-        """
-        children_text: list[str] = []
-        parent = self.navigator.find(parent_id, By.ID)
-        if parent.text == blank_value:
-            return children_text
-        for child in parent.find_elements(By.TAG_NAME, "a"):
-            children_text.append(child.text.lower())
-        return children_text
+        return self.page.get_text("type").lower()
 
     def load_series(self):
-        return self._load_children_link_text("series", "N/A")
+        return self.page.get_link_texts("series", "N/A")
 
     def load_artists(self):
-        return self._load_children_link_text("artists", "N/A")
+        return self.page.get_link_texts("artists", "N/A")
 
     def load_groups(self):
-        return self._load_children_link_text("groups", "N/A")
+        return self.page.get_link_texts("groups", "N/A")
 
     def load_characters(self):
-        return self._load_children_link_text("characters", "")
+        return self.page.get_link_texts("characters", "")
 
     def load_tags(self):
-        return self._load_children_link_text("tags", "")
+        return self.page.get_link_texts("tags", "")
 
     def load_date(self):
-        raw_date: str = self.navigator.find(".date").text
+        raw_date: str = self.page.get_text("date")
         return ConvertDatetime(raw_date)
 
     def load_doujin(self):
@@ -330,20 +390,67 @@ class DoujinPage():
         return doujin
 
 
+# Extracts everything in a search page, including the page list, with a single round trip to the browser.
+# Uses the same selectors as the page's elements used to be queried with
+LIST_PAGE_SCRIPT = """
+const xpath = (path) => {
+    const result = document.evaluate(path, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    return Array.from({length: result.snapshotLength}, (_, i) => result.snapshotItem(i));
+};
+const text = (element) => element.innerText.trim();
+const linkText = (element) => Array.from(element.getElementsByTagName("a"))
+    .map(a => a.textContent)
+    .filter(text => text !== "...")
+    .map(text => text.toLowerCase());
+const titles = Array.from(document.querySelectorAll(".lillie a"));
+return {
+    titles: titles.map(text),
+    urls: titles.map(a => a.href),
+    series: xpath("//table[@class='dj-desc']/tbody/tr[1]/td[2]").map(linkText),
+    types: xpath("//table[@class='dj-desc']/tbody/tr[2]/td[2]").map(text),
+    artists: Array.from(document.querySelectorAll(".artist-list")).map(linkText),
+    tags: Array.from(document.querySelectorAll(".relatedtags")).map(linkText),
+    dates: Array.from(document.querySelectorAll(".date")).map(text),
+    pages: Array.from(document.querySelectorAll(".page-container li")).map(li => {
+        const a = li.querySelector("a");
+        return [text(li), a ? a.href : null];
+    }),
+};
+"""
+
+
 class DoujinListPage():
-    def __init__(self, navigator: Navigator, url: str):
+    """
+    Search page turned into plain data as soon as it's loaded,
+    so it never needs to be loaded again
+    """
+
+    def __init__(self, navigator: Navigator, url: str, page_num=1):
         self.navigator = navigator
         self.url = url
-        self.doujin_list: list[Doujinshi] = []
-        self.pages = []
+        self.page_num = page_num
+        self.doujin_list: tuple[Doujinshi, ...] = ()
+        # Text and url (if it's a link) of each entry in the page list
+        self.pages: tuple[tuple[str, str | None], ...] = ()
 
     def try_loading(self, max_tries=3):
+        cache = self.navigator.cache
+        if cache is not None:
+            cached_data = cache.get(self.url)
+            if cached_data is not None:
+                self.doujin_list, self.pages = self.parse_page_data(
+                    json.loads(cached_data))
+                return
         tries = 1
         while tries <= max_tries:
             try:
                 self.navigator.load(self.url)
-                self.doujin_list = self.load_doujin_list()
-                self.pages = self.load_pages_link()
+                data = self.extract_page_data()
+                self.doujin_list, self.pages = self.parse_page_data(data)
+                if cache is not None:
+                    cache.put(self.url, json.dumps(
+                        data, ensure_ascii=False).encode("utf-8"))
+                return
             except WebException.TimeoutException:
                 Logger.log_warn("timeout, trying again\n")
                 tries += 1
@@ -351,112 +458,113 @@ class DoujinListPage():
                 continue
         raise Exception(f"Failed to load {self.navigator.get_current_url()}")
 
-    def load_pages_link(self) -> list[WebElement]:
-        pages = self.navigator.find_all('.page-container li')
-        return pages
+    def extract_page_data(self) -> dict[str, list]:
+        # Wait for the list to be rendered, then extract it in a single call
+        self.navigator.find_all(".lillie a", wait=True)
+        return self.navigator.execute_script(LIST_PAGE_SCRIPT)
 
-    def load_doujin_list(self) -> list[Doujinshi]:
-        def get_children_link_text(parent: WebElement):
-            children = []
-            try:
-                for child in parent.find_elements(By.TAG_NAME, "a"):
-                    text = child.get_attribute("textContent")
-                    if text != "...":
-                        children.append(text.lower())
-            except Exception as e:
-                Logger.log_warn(f"get_children exception: {e}\n")
-            return children
-
-        titles = self.navigator.find_all(".lillie a", wait=True)
-        series = self.navigator.find_all(
-            "//table[@class='dj-desc']/tbody/tr[1]/td[2]", By.XPATH)
-        types = self.navigator.find_all(
-            "//table[@class='dj-desc']/tbody/tr[2]/td[2]", By.XPATH)
-        artists = self.navigator.find_all(".artist-list")
-        tags = self.navigator.find_all(".relatedtags")
-        dates = self.navigator.find_all(".date")
-
-        same_len = len(titles) == len(series) == len(
-            types) == len(artists) == len(tags) == len(dates)
-        error_message = f"titles:{len(titles)} series:{len(series)} types:{len(types)} artists:{len(artists)} tags:{len(tags)} dates:{len(dates)}"
+    def parse_page_data(self, data: dict[str, list]) -> tuple[tuple[Doujinshi, ...], tuple[tuple[str, str | None], ...]]:
+        same_len = len(data["titles"]) == len(data["series"]) == len(data["types"]) == len(
+            data["artists"]) == len(data["tags"]) == len(data["dates"])
+        error_message = " ".join(
+            f"{key}:{len(value)}" for key, value in data.items() if key not in ["urls", "pages"])
         assert same_len, error_message
 
         doujin_list = []
-        for i, _ in enumerate(titles):
+        for i, title in enumerate(data["titles"]):
             doujin = Doujinshi()
-            doujin.name = titles[i].text
-            try:
-                doujin.url = titles[i].get_attribute("href")
-            except Exception as e:
-                Logger.log_warn(f"url exception: {e}\n")
-            doujin.type = types[i].text.lower()
-            doujin.artists = get_children_link_text(artists[i])
-            doujin.series = get_children_link_text(series[i])
-            doujin.tags = get_children_link_text(tags[i])
-            doujin.date = ConvertDatetime(dates[i].text)
+            doujin.name = title
+            doujin.url = data["urls"][i]
+            doujin.type = data["types"][i].lower()
+            doujin.artists = data["artists"][i]
+            doujin.series = data["series"][i]
+            doujin.tags = data["tags"][i]
+            doujin.date = ConvertDatetime(data["dates"][i])
             doujin_list.append(doujin)
-        return doujin_list
-
-    def get_next_page(self):
-        current_page: int = sys.maxsize
-        next_page_url = None
-        pages_str = "| "
-        for page in self.pages:
-            if page.text == "...":
-                pages_str += "... "
-                continue
-            try:
-                a_tag = page.find_element(By.TAG_NAME, "a")
-                page_num = int(a_tag.text)
-                if next_page_url is None and page_num > current_page:
-                    pages_str += f"[{page_num}] "
-                    current_page = page_num
-                    next_page_url = a_tag.get_attribute("href")
-                else:
-                    pages_str += f"{page_num} "
-            except WebException.NoSuchElementException:
-                pages_str += f"{page.text} "
-                current_page = int(page.text)
-            except Exception as e:
-                Logger.log_warn(f"Next page exception: {e}\n")
-                pass
-        pages_str += "|"
-        if next_page_url == None:
-            return None
-        Logger.log(f"{pages_str}\n")
-        return DoujinListPage(self.navigator, next_page_url)
+        pages = tuple((text, url) for text, url in data["pages"])
+        return tuple(doujin_list), pages
+
+    def get_num_pages(self) -> int:
+        """
+        Number of the last page in the page list
+        """
+        num_pages = self.page_num
+        for text, _ in self.pages:
+            if text.isdigit():
+                num_pages = max(num_pages, int(text))
+        return num_pages
 
 
 class DoujinIterator():
-    def __init__(self, navigator: Navigator, url: str):
-        navigator.load(url)
+    def __init__(self, navigator: Navigator, url: str, prefetch_pages=0):
         self.navigator = navigator
         self.url = url
-        self.current_page = DoujinListPage(self.navigator, self.url)
+        # Number of pages loaded ahead in another browser (0 to disable)
+        self.prefetch_pages = prefetch_pages
+        self.current_page: DoujinListPage | None = None
+        # Number of the page being iterated
+        self.page_num = 0
+        # Learned from the page list of the first page loaded
+        self.num_pages: int | None = None
+        self.prefetcher: PagePrefetcher[DoujinListPage] | None = None
 
     def get_extra_doujin_info(self, doujin: Doujinshi):
-        self.navigator.open_new_tab()
-        doujin_page = DoujinPage(doujin.url, self.navigator)
+        self.navigator.load_extra_doujin_info(doujin)
+
+    def load_doujin_list(self, page_num: int) -> tuple[Doujinshi, ...]:
+        return self.load_page(page_num).doujin_list
+
+    def load_page(self, page_num: int, navigator: Navigator | None = None) -> DoujinListPage:
+        """
+        Load any page of the search, the first one loaded also tells how many there are
+        """
+        if navigator is None:
+            navigator = self.navigator
+        page = DoujinListPage(
+            navigator, get_page_url(self.url, page_num), page_num)
+        page.try_loading()
+        if self.num_pages is None:
+            self.num_pages = page.get_num_pages()
+        Logger.log(f"Page {page_num}/{self.num_pages}\n")
+        return page
+
+    def load_pages(self, navigator: Navigator, start_page=1):
+        page_num = start_page
+        while self.num_pages is None or page_num <= self.num_pages:
+            yield self.load_page(page_num, navigator)
+            page_num += 1
+
+    def prefetch_pages_in_new_browser(self, start_page=1):
+        navigator = Navigator(cache=self.navigator.cache)
         try:
-            doujin.groups.extend(doujin_page.load_groups())
-            doujin.characters.extend(doujin_page.load_characters())
-        except Exception as e:
-            Logger.log_warn(f"doujin info exception: {e}\n")
-        self.navigator.close_tab()
-
-    def next(self):
-        while self.current_page:
-            self.current_page.try_loading()
-            for i, doujin in enumerate(self.current_page.doujin_list):
-                if i == 0:
-                    Logger.log(f"{doujin.date}\n")
-                yield (i, doujin)
-            self.current_page = self.current_page.get_next_page()
-
-    def reload_page(self):
-        if self.current_page == None:
-            return
-        self.current_page.try_loading()
+            yield from self.load_pages(navigator, start_page)
+        finally:
+            navigator.quit()
+
+    def next(self, start_page=1):
+        pages = self.load_pages(self.navigator, start_page)
+        if self.prefetch_pages > 0:
+            self.prefetcher = PagePrefetcher(
+                lambda: self.prefetch_pages_in_new_browser(start_page), self.prefetch_pages)
+            pages = iter(self.prefetcher)
+        try:
+            for page in pages:
+                self.current_page = page
+                self.page_num = page.page_num
+                for i, doujin in enumerate(page.doujin_list):
+                    if i == 0:
+                        Logger.log(f"{doujin.date}\n")
+                    yield (i, doujin)
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Stop loading pages ahead
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+            self.prefetcher = None
 
     def is_last_of_page(self, i: int) -> bool:
         if self.current_page == None:
@@ -0,0 +1,131 @@
+from typing import Callable
+from urllib.parse import unquote, urlparse
+import threading
+
+import numpy as np
+
+from .config import Filters
+from .logger import Logger
+from .query import QueryPlan
+
+
+# Gallery id lists are big-endian 32-bit unsigned ints
+NOZOMI_DTYPE = np.dtype(">u4")
+
+
+def parse_nozomi(data: bytes) -> np.ndarray:
+    """
+    Gallery ids of a .nozomi file, in the same order as the site lists them
+    """
+    return np.frombuffer(data, dtype=NOZOMI_DTYPE).astype(np.uint32)
+
+
+def get_nozomi_paths(url: str) -> tuple[list[str], list[str]]:
+    """
+    Convert a site url (homepage, search, artist, group or series page) to the
+    paths of the gallery id lists that must be included and the ones that must be excluded
+    """
+    parsed_url = urlparse(url)
+    path = unquote(parsed_url.path)
+    if path in ["", "/", "/index.html"]:
+        return ["n/index-all.nozomi"], []
+    if path != "/search.html":
+        # /artist/name-japanese.html
+        area, page = path.strip("/").split("/", 1)
+        return [f"n/{area}/{page.removesuffix('.html')}.nozomi"], []
+    terms = [term for term in unquote(parsed_url.query).split(" ") if ":" in term]
+    # Every other list only needs the galleries in the search's language
+    language = "all"
+    for term in terms:
+        if term.startswith("language:"):
+            language = term.split(":", 1)[1]
+    include: list[str] = []
+    exclude: list[str] = []
+    for term in terms:
+        is_excluded = term.startswith("-")
+        term = term.removeprefix("-").replace("_", " ")
+        area, tag = term.split(":", 1)
+        if area == "language":
+            continue
+        elif area in ["female", "male"]:
+            nozomi_path = f"n/tag/{term}-{language}.nozomi"
+        else:
+            nozomi_path = f"n/{area}/{tag}-{language}.nozomi"
+        if is_excluded:
+            exclude.append(nozomi_path)
+        else:
+            include.append(nozomi_path)
+    if len(include) == 0:
+        include.append(f"n/index-{language}.nozomi")
+    return include, exclude
+
+
+def is_in_any(ids: np.ndarray, id_lists: list[np.ndarray]) -> np.ndarray:
+    """
+    Mask of the sorted `ids` that are in any of the sorted `id_lists`.
+    Gallery ids are small, so they're marked in a table indexed by id
+    (a few MB) instead of searching for each one
+    """
+    if len(ids) == 0:
+        return np.zeros(0, dtype=bool)
+    table = np.zeros(int(ids[-1]) + 1, dtype=bool)
+    for other_ids in id_lists:
+        table[other_ids[:np.searchsorted(other_ids, len(table))]] = True
+    return table[ids]
+
+
+class NozomiIndex():
+    """
+    Searches the site's gallery id lists (one for each tag, language, type, artist, series, etc)
+    the way the site's javascript does, with numpy set operations instead of rendering search pages.
+    Each list is loaded once with `load`, which gets a file of the gallery data by its path
+    (from the page cache, the site or a local stand-in server), or None if there's no such file
+    """
+
+    def __init__(self, load: Callable[[str], bytes | None]):
+        self.load = load
+        # Sorted ids of the lists already loaded, most searches share the ones they exclude
+        self.id_lists: dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def get_ids(self, path: str) -> np.ndarray:
+        """
+        Ids of the list in `path`, sorted and without repeats.
+        Like the site's javascript, a list that doesn't exist has no ids
+        """
+        with self._lock:
+            if path in self.id_lists:
+                return self.id_lists[path]
+        # Lists are newest first, reversed they're (almost) sorted already,
+        # which a stable sort goes through in about linear time
+        data = self.load(path)
+        if data is None:
+            Logger.log_warn(f"No gallery list {path}, it has no doujin\n")
+            data = b""
+        ids = np.sort(parse_nozomi(data)[::-1], kind="stable")
+        if len(ids) > 1:
+            ids = ids[np.concatenate(([True], ids[1:] != ids[:-1]))]
+        with self._lock:
+            self.id_lists[path] = ids
+        return ids
+
+    def search(self, url: str, min_gallery_id=0) -> np.ndarray:
+        """
+        Ids of the galleries listed in `url` above `min_gallery_id`, newest (highest id) first
+        """
+        include, exclude = get_nozomi_paths(url)
+        # Start with the smallest list, the others only tell which of its ids to keep
+        included_lists = sorted((self.get_ids(path) for path in include), key=len)
+        ids = included_lists[0]
+        ids = ids[np.searchsorted(ids, min_gallery_id, side="right"):]
+        for other_ids in included_lists[1:]:
+            ids = ids[is_in_any(ids, [other_ids])]
+        if len(exclude) > 0:
+            ids = ids[~is_in_any(ids, [self.get_ids(path) for path in exclude])]
+        return ids[::-1]
+
+    def search_filters(self, filters: Filters, min_gallery_id=0) -> np.ndarray:
+        """
+        Ids of the galleries that pass the filters the site can apply
+        """
+        return self.search(QueryPlan(filters).url, min_gallery_id)
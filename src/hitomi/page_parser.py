@@ -0,0 +1,99 @@
+from html.parser import HTMLParser
+
+
+# Elements of a gallery page that hold the doujin's info
+GALLERY_FIELD_IDS = ["gallery-brand", "type", "series",
+                     "artists", "groups", "characters", "tags"]
+# Tags that never have a closing tag
+VOID_TAGS = ["area", "base", "br", "col", "embed", "hr", "img",
+             "input", "link", "meta", "source", "track", "wbr"]
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+class PageField():
+    def __init__(self):
+        self.text = ""
+        self.links: list[str] = []
+
+
+class GalleryPageParser(HTMLParser):
+    """
+    Collects the text and link texts of the gallery info elements
+    from a snapshot of a rendered gallery page
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields: dict[str, PageField] = {}
+        # Open tags and the field each one belongs to, if any
+        self._stack: list[tuple[str, str | None]] = []
+        self._link_text: str | None = None
+
+    def _current_field(self) -> str | None:
+        for _, field in reversed(self._stack):
+            if field is not None:
+                return field
+        return None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        attributes = dict(attrs)
+        field = None
+        id = attributes.get("id")
+        classes = (attributes.get("class") or "").split()
+        if id in GALLERY_FIELD_IDS and id not in self.fields:
+            field = id
+            self.fields[id] = PageField()
+        elif "date" in classes and "date" not in self.fields:
+            field = "date"
+            self.fields["date"] = PageField()
+        self._stack.append((tag, field))
+        if tag == "a" and self._current_field() is not None:
+            self._link_text = ""
+
+    def handle_endtag(self, tag):
+        if not any(open_tag == tag for open_tag, _ in self._stack):
+            return
+        while len(self._stack) > 0:
+            open_tag, _ = self._stack.pop()
+            if open_tag == "a" and self._link_text is not None:
+                field = self._current_field()
+                if field is not None:
+                    self.fields[field].links.append(
+                        normalize_text(self._link_text))
+                self._link_text = None
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        field = self._current_field()
+        if field is None:
+            return
+        self.fields[field].text += data
+        if self._link_text is not None:
+            self._link_text += data
+
+    def get_text(self, field: str) -> str:
+        if field not in self.fields:
+            return ""
+        return normalize_text(self.fields[field].text)
+
+    def get_link_texts(self, field: str, blank_value: str) -> list[str]:
+        """
+        Return the lowercase text of all links inside `field`
+        or nothing if the field only has `blank_value`
+        """
+        if self.get_text(field) == blank_value:
+            return []
+        return [text.lower() for text in self.fields[field].links]
+
+
+def parse_gallery_page(html: str) -> GalleryPageParser:
+    parser = GalleryPageParser()
+    parser.feed(html)
+    parser.close()
+    return parser
@@ -0,0 +1,61 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+import threading
+
+from .api import HttpNavigator
+from .backend import create_navigator
+from .cache import PageCache
+from .logger import Logger
+from .navigator import Navigator
+
+
+class NavigatorPool():
+    """
+    Bounded pool of worker threads where each worker drives its own navigator.
+    Navigators are only opened when a worker runs its first task.
+    """
+
+    def __init__(self, num_workers: int, backend="browser", load_images=False, cache: PageCache | None = None):
+        self.num_workers = num_workers
+        self.backend = backend
+        self.load_images = load_images
+        # Shared by all navigators
+        self.cache = cache
+        self.navigators: list[Navigator | HttpNavigator] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=num_workers,
+                                            thread_name_prefix="navigator")
+
+    def _get_navigator(self) -> Navigator | HttpNavigator:
+        navigator: Navigator | HttpNavigator | None = getattr(
+            self._local, "navigator", None)
+        if navigator is None:
+            with self._lock:
+                navigator = create_navigator(
+                    self.backend, self.load_images, self.cache)
+                self.navigators.append(navigator)
+            self._local.navigator = navigator
+        return navigator
+
+    def _run(self, task: Callable[..., Any], *args):
+        return task(self._get_navigator(), *args)
+
+    def submit(self, task: Callable[..., Any], *args) -> Future:
+        """
+        Run `task(navigator, *args)` on the first free worker
+        """
+        return self._executor.submit(self._run, task, *args)
+
+    def shutdown(self, wait=True):
+        """
+        Stop the workers and close their navigators.
+        If `wait` is false pending tasks are cancelled and running ones are
+        left to fail once their navigator is closed
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+        with self._lock:
+            for navigator in self.navigators:
+                navigator.quit()
+            self.navigators.clear()
+        Logger.log(f"Closed {self.num_workers} workers\n")
@@ -0,0 +1,74 @@
+from queue import Empty, Full, Queue
+from typing import Callable, Generic, Iterator, TypeVar
+import threading
+
+
+Page = TypeVar("Page")
+
+# Kinds of entries in the prefetch queue
+PAGE = "page"
+DONE = "done"
+ERROR = "error"
+
+
+class PagePrefetcher(Generic[Page]):
+    """
+    Loads the pages of `load_pages` in a background thread, keeping up to
+    `depth` pages ready ahead of the one being processed.
+    Closing it (or leaving the loop early) stops the thread once the page
+    it's loading is done.
+    """
+
+    def __init__(self, load_pages: Callable[[], Iterator[Page]], depth: int):
+        self.depth = depth
+        self._queue: Queue[tuple[str, Page | BaseException | None]] = Queue(
+            maxsize=depth)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(load_pages,),
+                                        name="prefetch", daemon=True)
+        self._thread.start()
+
+    def _run(self, load_pages: Callable[[], Iterator[Page]]):
+        try:
+            for page in load_pages():
+                if not self._put((PAGE, page)):
+                    return
+            self._put((DONE, None))
+        except BaseException as e:
+            self._put((ERROR, e))
+
+    def _put(self, entry: tuple[str, Page | BaseException | None]) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(entry, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def __iter__(self) -> Iterator[Page]:
+        try:
+            while True:
+                try:
+                    kind, value = self._queue.get(timeout=0.1)
+                except Empty:
+                    continue
+                if kind == DONE:
+                    return
+                if kind == ERROR:
+                    assert isinstance(value, BaseException)
+                    raise value
+                yield value  # type: ignore
+        finally:
+            self.close()
+
+    def close(self):
+        self._stop.set()
+        # Free the producer if it's waiting for room in the queue
+        while not self._queue.empty():
+            try:
+                self._queue.get_nowait()
+            except Empty:
+                break
+        if self._thread is not threading.current_thread():
+            self._thread.join()
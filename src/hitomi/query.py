@@ -0,0 +1,92 @@
+from copy import copy
+from urllib.parse import unquote, urlparse
+
+from .config import Filters
+from .matching import CompiledFilters
+
+
+SITE_URL = "https://hitomi.la"
+# Pages that list the doujin of a single artist, group, etc (/artist/name-japanese.html)
+SCOPE_AREAS = ["artist", "group", "series", "character", "tag"]
+
+
+def to_search_term(area: str, name: str, exclude=False) -> str:
+    return f"{'-' if exclude else ''}{area}%3A{name.replace(' ', '_')}"
+
+
+def tag_to_search_term(tag: str, exclude=False) -> str:
+    if "♀" in tag:
+        return to_search_term("female", tag.replace(" ♀", ""), exclude)
+    if "♂" in tag:
+        return to_search_term("male", tag.replace(" ♂", ""), exclude)
+    return to_search_term("tag", tag, exclude)
+
+
+def get_scope_term(url: str) -> str | None:
+    """
+    Search term for the artist, group, series, etc listed in `url`
+    or None if it isn't one of their pages
+    """
+    path = unquote(urlparse(url).path).strip("/")
+    if "/" not in path:
+        return None
+    area, page = path.split("/", 1)
+    if area not in SCOPE_AREAS:
+        return None
+    # name-japanese.html
+    name = page.removesuffix(".html").rsplit("-", 1)[0]
+    return to_search_term(area, name)
+
+
+class QueryPlan():
+    """
+    Site search that applies as many filters as possible, so only the doujin
+    that pass them are listed
+    """
+
+    def __init__(self, filters: Filters, scope_url: str | None = None):
+        self.terms: list[str] = []
+        # Filters the site can't apply, doujin still have to be matched against them
+        self.filters = copy(filters)
+        self.local_checks: list[str] = []
+
+        if scope_url is not None:
+            scope_term = get_scope_term(scope_url)
+            if scope_term is None:
+                raise ValueError(f"Can't search inside {scope_url}")
+            self.terms.append(scope_term)
+        if filters.must_include_series:
+            self.terms.append(to_search_term(
+                "series", filters.must_include_series))
+            self.filters.must_include_series = ""
+        if filters.language:
+            self.terms.append(to_search_term("language", filters.language[1]))
+        for type in sorted(filters.must_exclude_type):
+            self.terms.append(to_search_term(
+                "type", type.replace(" ", ""), exclude=True))
+        self.filters.must_exclude_type = set()
+        for tag in sorted(filters.must_include_tags):
+            self.terms.append(tag_to_search_term(tag))
+        self.filters.must_include_tags = set()
+        for tag in sorted(filters.must_exclude_tags):
+            self.terms.append(tag_to_search_term(tag, exclude=True))
+        self.filters.must_exclude_tags = set()
+        # Characters aren't shown in search pages, searching for them saves loading each doujin page
+        for character in sorted(filters.must_include_characters):
+            self.terms.append(to_search_term("character", character))
+        self.filters.must_include_characters = set()
+
+        if filters.max_num_artists > 0:
+            self.local_checks.append("max_num_artists")
+
+        # Matches doujin against the remaining filters
+        self.matcher = CompiledFilters(self.filters)
+
+        if len(self.terms) > 0:
+            self.url = f"{SITE_URL}/search.html?{'%20'.join(self.terms)}"
+        else:
+            self.url = SITE_URL
+
+    def __str__(self):
+        local_checks = ", ".join(self.local_checks) or "none"
+        return f"{self.url} (checked locally: {local_checks})"
@@ -0,0 +1,103 @@
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from .doujinshi import get_gallery_id_from_url
+from .logger import Logger
+
+
+# Ids in each chunk of the bitmap (8 KB), chunks are only made for the ranges that have ids
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+
+
+def to_gallery_id(item: int | str) -> int:
+    if isinstance(item, int):
+        return item
+    # Most urls end in -123456.html, which is faster to split than to search
+    if item.endswith(".html"):
+        number = item[item.rfind("-") + 1:-5]
+        if number.isdecimal():
+            return int(number)
+    return get_gallery_id_from_url(item)
+
+
+class GallerySet():
+    """
+    Set of gallery ids, which can be given as ids or gallery urls.
+    Ids are bits of a bitmap split in chunks, like a roaring bitmap, so the ids of the
+    whole site take a few hundred KB and each one is looked up with a single bit test.
+    Urls without a gallery id are skipped
+    """
+
+    def __init__(self, items: Iterable[int | str] = ()):
+        self._chunks: dict[int, bytearray] = {}
+        self._len = 0
+        self.update(items)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self) -> Iterator[int]:
+        for key in sorted(self._chunks):
+            bits = np.unpackbits(np.frombuffer(self._chunks[key], dtype=np.uint8), bitorder="little")
+            yield from (np.flatnonzero(bits) + (key << CHUNK_BITS)).tolist()
+
+    def __contains__(self, item: int | str) -> bool:
+        try:
+            id = to_gallery_id(item)
+        except ValueError:
+            return False
+        chunk = self._chunks.get(id >> CHUNK_BITS)
+        offset = id & (CHUNK_SIZE - 1)
+        return chunk is not None and chunk[offset >> 3] & (1 << (offset & 7)) != 0
+
+    def _to_id(self, item: int | str) -> int | None:
+        try:
+            return to_gallery_id(item)
+        except ValueError:
+            Logger.log_warn(f"No gallery id in '{item}', skipping it\n")
+            return None
+
+    def _add_id(self, id: int) -> bool:
+        """
+        Returns False if it was already in the set
+        """
+        chunk = self._chunks.get(id >> CHUNK_BITS)
+        if chunk is None:
+            chunk = bytearray(CHUNK_SIZE // 8)
+            self._chunks[id >> CHUNK_BITS] = chunk
+        offset = id & (CHUNK_SIZE - 1)
+        mask = 1 << (offset & 7)
+        if chunk[offset >> 3] & mask:
+            return False
+        chunk[offset >> 3] |= mask
+        self._len += 1
+        return True
+
+    def add(self, item: int | str):
+        id = self._to_id(item)
+        if id is not None:
+            self._add_id(id)
+
+    def update(self, *others: Iterable[int | str]) -> list[int]:
+        """
+        Add all the items at once. Returns the ids that weren't in the set
+        """
+        return [id for other in others for id in map(self._to_id, other)
+                if id is not None and self._add_id(id)]
+
+    def discard(self, item: int | str):
+        id = self._to_id(item)
+        if id is None:
+            return
+        chunk = self._chunks.get(id >> CHUNK_BITS)
+        offset = id & (CHUNK_SIZE - 1)
+        mask = 1 << (offset & 7)
+        if chunk is not None and chunk[offset >> 3] & mask:
+            chunk[offset >> 3] &= ~mask
+            self._len -= 1
+
+    def clear(self):
+        self._chunks = {}
+        self._len = 0
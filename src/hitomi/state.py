@@ -0,0 +1,254 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+import threading
+
+from .config import Config
+from .database import open_database
+from .seen import GallerySet, to_gallery_id
+
+
+CURSOR_KEYS = ["cursor_url", "cursor_page_num", "cursor_index",
+               "cursor_new_stop_datetime", "cursor_new_stop_title", "cursor_new_high_water_mark"]
+
+
+class CrawlCursor():
+    """
+    Position of a search, so an interrupted one can start again from the page it was in
+    """
+
+    def __init__(self, url: str, page_num=1, index=0):
+        self.url = url
+        self.page_num = page_num
+        # Position in the page of the last doujin checked
+        self.index = index
+        # Newest doujin of the search (None if not set yet), the stop point of the next search
+        self.new_stop_datetime: datetime | None = None
+        self.new_stop_title = ""
+        # Highest gallery id checked by the search, the high-water mark once it finishes
+        self.new_high_water_mark = 0
+
+
+class StoredSet(set):
+    """
+    Set whose items are also saved in a table of the state store as they are added or removed
+    """
+
+    def __init__(self, state: "SearchState", table: str, items: Iterable[str] = ()):
+        # Items given here are already saved
+        super().__init__(items)
+        self.state = state
+        self.table = table
+
+    def add(self, item: str):
+        if item in self:
+            return
+        super().add(item)
+        self.state.insert(self.table, [item])
+
+    def update(self, *others: Iterable[str]):
+        new_items = [item for other in others for item in other if item not in self]
+        super().update(new_items)
+        self.state.insert(self.table, new_items)
+
+    def discard(self, item: str):
+        super().discard(item)
+        self.state.delete(self.table, item)
+
+    def remove(self, item: str):
+        super().remove(item)
+        self.state.delete(self.table, item)
+
+    def clear(self):
+        super().clear()
+        self.state.delete_all(self.table)
+
+
+class StoredGallerySet(GallerySet):
+    """
+    Gallery set whose ids are also saved in the state store as they are added or removed
+    """
+
+    def __init__(self, state: "SearchState", ids: Iterable[int] = ()):
+        self.state = state
+        super().__init__()
+        # Ids given here are already saved
+        GallerySet.update(self, ids)
+
+    def add(self, item: int | str):
+        id = self._to_id(item)
+        if id is not None and self._add_id(id):
+            self.state.insert("seen_galleries", [id])
+
+    def update(self, *others: Iterable[int | str]) -> list[int]:
+        new_ids = super().update(*others)
+        self.state.insert("seen_galleries", new_ids)
+        return new_ids
+
+    def discard(self, item: int | str):
+        id = self._to_id(item)
+        if id is not None:
+            super().discard(id)
+            self.state.delete("seen_galleries", id)
+
+    def clear(self):
+        super().clear()
+        self.state.delete_all("seen_galleries")
+
+
+class SearchState():
+    """
+    State of the current search (seen doujin, unread series, stop point and whether it's finished)
+    and the high-water marks of past searches.
+    Each change is saved on its own transaction as it happens,
+    so it isn't lost if the search is killed
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = open_database(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS seen_galleries (item INTEGER PRIMARY KEY)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS unread_series (item TEXT PRIMARY KEY) WITHOUT ROWID")
+        self._migrate_seen_urls()
+        self._db.execute("""CREATE TABLE IF NOT EXISTS high_water_marks (
+            url TEXT PRIMARY KEY,
+            gallery_id INTEGER NOT NULL) WITHOUT ROWID""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS state_values (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL) WITHOUT ROWID""")
+        self._db.commit()
+
+    def _migrate_seen_urls(self):
+        """
+        Seen doujin used to be saved by url, only their gallery ids are kept now
+        """
+        if self._db.execute("SELECT name FROM sqlite_master WHERE name = 'seen_doujinshi'").fetchone() is None:
+            return
+        ids = []
+        for url, in self._db.execute("SELECT item FROM seen_doujinshi"):
+            try:
+                ids.append((to_gallery_id(url),))
+            except ValueError:
+                continue
+        self._db.executemany(
+            "INSERT OR IGNORE INTO seen_galleries (item) VALUES (?)", ids)
+        self._db.execute("DROP TABLE seen_doujinshi")
+        self._db.commit()
+
+    def insert(self, table: str, items: Iterable[int | str]):
+        with self._lock:
+            self._db.executemany(
+                f"INSERT OR IGNORE INTO {table} (item) VALUES (?)", [(item,) for item in items])
+            self._db.commit()
+
+    def delete(self, table: str, item: int | str):
+        with self._lock:
+            self._db.execute(f"DELETE FROM {table} WHERE item = ?", (item,))
+            self._db.commit()
+
+    def delete_all(self, table: str):
+        with self._lock:
+            self._db.execute(f"DELETE FROM {table}")
+            self._db.commit()
+
+    def load(self, config: Config):
+        """
+        Set the state values of `config` to the saved ones.
+        If nothing was saved yet, the ones `config` has (from an older config.json) are saved instead
+        """
+        with self._lock:
+            values = dict(self._db.execute(
+                "SELECT key, value FROM state_values").fetchall())
+        if len(values) == 0:
+            self.insert("seen_galleries", GallerySet(config.seen_doujinshi))
+            self.insert("unread_series", config.unread_series)
+            self.save(config)
+        else:
+            config.stop_datetime = datetime.fromisoformat(values["stop_datetime"])
+            config.stop_title = values["stop_title"]
+            config.search_is_incomplete = values["search_is_incomplete"] == "1"
+        with self._lock:
+            seen_ids = [row[0] for row in self._db.execute("SELECT item FROM seen_galleries")]
+            unread_series = [row[0] for row in self._db.execute("SELECT item FROM unread_series")]
+        config.seen_doujinshi = StoredGallerySet(self, seen_ids)
+        config.unread_series = StoredSet(self, "unread_series", unread_series)
+
+    def save(self, config: Config):
+        """
+        Save the stop point and whether the search is incomplete, the sets are saved as they change
+        """
+        values = {
+            "stop_datetime": config.stop_datetime.isoformat(),
+            "stop_title": config.stop_title,
+            "search_is_incomplete": "1" if config.search_is_incomplete else "0",
+        }
+        with self._lock:
+            self._db.executemany(
+                """INSERT INTO state_values (key, value) VALUES (?, ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value""",
+                list(values.items()))
+            self._db.commit()
+
+    def get_cursor(self) -> CrawlCursor | None:
+        with self._lock:
+            values = dict(self._db.execute(
+                f"SELECT key, value FROM state_values WHERE key IN ({', '.join('?' * len(CURSOR_KEYS))})",
+                CURSOR_KEYS).fetchall())
+        if "cursor_url" not in values:
+            return None
+        cursor = CrawlCursor(values["cursor_url"],
+                             int(values["cursor_page_num"]),
+                             int(values["cursor_index"]))
+        if values["cursor_new_stop_datetime"]:
+            cursor.new_stop_datetime = datetime.fromisoformat(
+                values["cursor_new_stop_datetime"])
+        cursor.new_stop_title = values["cursor_new_stop_title"]
+        # Cursors saved before the high-water marks don't have it
+        cursor.new_high_water_mark = int(values.get("cursor_new_high_water_mark", 0))
+        return cursor
+
+    def save_cursor(self, cursor: CrawlCursor):
+        new_stop_datetime = ""
+        if cursor.new_stop_datetime is not None:
+            new_stop_datetime = cursor.new_stop_datetime.isoformat()
+        values = [cursor.url, str(cursor.page_num), str(cursor.index),
+                  new_stop_datetime, cursor.new_stop_title, str(cursor.new_high_water_mark)]
+        with self._lock:
+            self._db.executemany(
+                """INSERT INTO state_values (key, value) VALUES (?, ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value""",
+                list(zip(CURSOR_KEYS, values)))
+            self._db.commit()
+
+    def clear_cursor(self):
+        with self._lock:
+            self._db.execute(
+                f"DELETE FROM state_values WHERE key IN ({', '.join('?' * len(CURSOR_KEYS))})", CURSOR_KEYS)
+            self._db.commit()
+
+    def get_high_water_mark(self, url: str) -> int:
+        """
+        Highest gallery id checked by the last finished search of `url`, 0 if it was never finished
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT gallery_id FROM high_water_marks WHERE url = ?", (url,)).fetchone()
+        return 0 if row is None else row[0]
+
+    def save_high_water_mark(self, url: str, gallery_id: int):
+        """
+        Raise the high-water mark of `url` to `gallery_id`, it's never lowered
+        """
+        with self._lock:
+            self._db.execute(
+                """INSERT INTO high_water_marks (url, gallery_id) VALUES (?, ?)
+                ON CONFLICT (url) DO UPDATE SET gallery_id = max(gallery_id, excluded.gallery_id)""",
+                (url, gallery_id))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,134 @@
+from datetime import datetime
+from hashlib import sha256
+from pathlib import Path
+import json
+import threading
+
+from .config import Filters
+from .database import GALLERY_COLUMNS, open_database, create_galleries_table, encode_gallery_row, decode_gallery_row
+from .doujinshi import Doujinshi, get_gallery_id_from_url
+
+
+class GalleryStore():
+    """
+    Full info of every doujin whose gallery page was loaded, kept between searches
+    under its gallery id so each gallery page only needs to be loaded once
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = open_database(path)
+        create_galleries_table(self._db)
+        self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM galleries").fetchone()[0]
+
+    def get(self, gallery_id: int) -> Doujinshi | None:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(GALLERY_COLUMNS)} FROM galleries WHERE id = ?",
+                (gallery_id,)).fetchone()
+        if row is None:
+            return None
+        return decode_gallery_row(row)
+
+    def get_by_url(self, url: str) -> Doujinshi | None:
+        try:
+            return self.get(get_gallery_id_from_url(url))
+        except ValueError:
+            return None
+
+    def upsert(self, doujin: Doujinshi):
+        """
+        Save `doujin`, replacing the info of its gallery if it was already saved
+        """
+        row = encode_gallery_row(doujin)
+        updates = ", ".join(f"{column} = excluded.{column}"
+                            for column in [*GALLERY_COLUMNS, "updated"])
+        with self._lock:
+            self._db.execute(
+                f"""INSERT INTO galleries (id, {', '.join(GALLERY_COLUMNS)}, updated)
+                VALUES ({', '.join('?' * len(row))}, julianday('now'))
+                ON CONFLICT (id) DO UPDATE SET {updates}""",
+                row)
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def get_filters_fingerprint(filters: Filters) -> str:
+    """
+    Hash of the filters, verdicts made with other filters can't be reused
+    """
+    return sha256(json.dumps(filters.toJSON(), sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ArtistVerdict():
+    def __init__(self, url: str):
+        self.url = url
+        self.can_add = False
+        # Titles of the doujin that fit the filters and are not anthologies
+        self.created_titles: set[str] = set()
+        # Date of the newest doujin checked, older ones don't need to be checked again
+        self.newest_date: datetime | None = None
+
+
+class ArtistStore():
+    """
+    Result of checking each artist and group page, kept between searches so later
+    searches only need to check the doujin uploaded since then
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = open_database(path)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS artists (
+            url TEXT PRIMARY KEY,
+            filters TEXT NOT NULL,
+            can_add INTEGER NOT NULL,
+            created_titles TEXT NOT NULL,
+            newest_date TEXT,
+            updated REAL NOT NULL)""")
+        self._db.commit()
+
+    def get(self, url: str, filters_fingerprint: str) -> ArtistVerdict:
+        """
+        Last verdict of the artist or group in `url`,
+        or a new one if it wasn't checked with the same filters
+        """
+        verdict = ArtistVerdict(url)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT can_add, created_titles, newest_date FROM artists WHERE url = ? AND filters = ?",
+                (url, filters_fingerprint)).fetchone()
+        if row is not None:
+            verdict.can_add = bool(row[0])
+            verdict.created_titles = set(json.loads(row[1]))
+            if row[2] is not None:
+                verdict.newest_date = datetime.fromisoformat(row[2])
+        return verdict
+
+    def save(self, verdict: ArtistVerdict, filters_fingerprint: str):
+        newest_date = None
+        if verdict.newest_date is not None:
+            newest_date = verdict.newest_date.isoformat()
+        with self._lock:
+            self._db.execute(
+                """INSERT INTO artists (url, filters, can_add, created_titles, newest_date, updated)
+                VALUES (?, ?, ?, ?, ?, julianday('now'))
+                ON CONFLICT (url) DO UPDATE SET filters = excluded.filters, can_add = excluded.can_add,
+                created_titles = excluded.created_titles, newest_date = excluded.newest_date,
+                updated = excluded.updated""",
+                (verdict.url, filters_fingerprint, int(verdict.can_add),
+                 json.dumps(sorted(verdict.created_titles), ensure_ascii=False), newest_date))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
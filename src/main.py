@@ -7,7 +7,12 @@ from os import getenv
 from pathlib import Path
 from dotenv import load_dotenv
 from urllib.parse import unquote
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable
+import asyncio
 import shutil
+import threading
 
 import bookmarks
 import serialization
@@ -23,10 +28,30 @@ BROWSER_NAME = getenv("BROWSER_NAME")
 WORKSPACE_DIR = Path(__file__).parent.parent.resolve()
 OUTPUT_DIR = Path(WORKSPACE_DIR, "output")
 OUTPUT_BACKUP_DIR = Path(WORKSPACE_DIR, "output-backup")
+# Entries of each list written as soon as they are added, read back to resume a search
+JOURNAL_DIR = Path(OUTPUT_DIR, "journal")
+LIST_NAMES = ["doujin_included", "doujin_excluded",
+              "artist_included", "artist_excluded"]
 CONFIG_FILE = Path(WORKSPACE_DIR, "config")
 CONFIG_BACKUP_FILE = Path(WORKSPACE_DIR, "config-backup.json")
+CACHE_DIR = Path(WORKSPACE_DIR, "cache")
+DATA_DIR = Path(WORKSPACE_DIR, "data")
+GALLERY_STORE_FILE = Path(DATA_DIR, "galleries.sqlite")
+ARTIST_STORE_FILE = Path(DATA_DIR, "artists.sqlite")
+CATALOG_FILE = Path(DATA_DIR, "catalog.sqlite")
+SEARCH_STATE_FILE = Path(DATA_DIR, "state.sqlite")
 # Services
 serializer = serialization.JsonSerializer()
+# Pages kept on disk between searches, opened by the first navigator
+page_cache: hitomi.PageCache | None = None
+# Full info of the doujin whose page was loaded in any search
+gallery_store: hitomi.GalleryStore | None = None
+# Result of the artist and group checks of past searches
+artist_store: hitomi.ArtistStore | None = None
+# Seen doujin, unread series and stop point of the current search
+search_state: hitomi.SearchState | None = None
+# Stores are first opened by whichever worker needs them
+stores_lock = threading.Lock()
 #####################################################################
 
 
@@ -35,8 +60,10 @@ def load_config():
     if config == None:
         hitomi.Logger.log("No config, loading default\n")
         config = hitomi.Config()
+    get_search_state().load(config)
     if not config.search_is_incomplete:
         config.seen_doujinshi.clear()
+        get_search_state().clear_cursor()
     hitomi.Logger.log("Loading artists\n")
     if BROWSER_NAME:
         config.added_artists = bookmarks.load_artists(BROWSER_NAME)
@@ -52,9 +79,18 @@ def dump_config_file(config: hitomi.Config | None):
     if not config:
         return
     serializer.dump_to_file(CONFIG_FILE, config)
+    get_search_state().save(config)
 
 
-def remove_repeated_entries(data_list):
+def get_search_state() -> hitomi.SearchState:
+    global search_state
+    with stores_lock:
+        if search_state is None:
+            search_state = hitomi.SearchState(SEARCH_STATE_FILE)
+    return search_state
+
+
+def remove_repeated_entries(data_list: list):
     if len(data_list) <= 1:
         return data_list
     unique_list = []
@@ -65,7 +101,8 @@ def remove_repeated_entries(data_list):
         else:
             seen_url.add(data.url)
             unique_list.append(data)
-    data_list = unique_list
+    data_list[:] = unique_list
+    return data_list
 
 
 def dump_list(filename: str, data: list):
@@ -74,7 +111,7 @@ def dump_list(filename: str, data: list):
     serializer.dump_to_file(path, data)
 
 
-def dump_lists(lists: dict[str, list]):
+def dump_lists(lists: dict[str, list], add_to_catalog=True):
     hitomi.Logger.log(
         f"TOTAL: {len(lists[f'doujin_included'])} doujinshi and {len(lists['artist_included'])} artists\n")
     hitomi.Logger.log("Dumping lists...\n")
@@ -83,61 +120,148 @@ def dump_lists(lists: dict[str, list]):
             lists[dir].sort(key=lambda x: x.name)
             remove_repeated_entries(lists[dir])
         dump_list(dir, lists[dir])
+    if add_to_catalog:
+        add_lists_to_catalog(lists)
+
+
+def add_lists_to_catalog(lists: dict[str, list]):
+    catalog = hitomi.GalleryCatalog(CATALOG_FILE)
+    catalog.add_all(lists["doujin_included"], included=True)
+    catalog.add_all(lists["doujin_excluded"], included=False)
+    catalog.close()
+
+
+def load_entry(list_name: str, json_data: dict) -> hitomi.Doujinshi | hitomi.Artist | None:
+    if list_name.startswith("doujin"):
+        return hitomi.Doujinshi.fromJSON(json_data)
+    return hitomi.Artist.fromJSON(json_data)
+
+
+def open_lists(resume: bool) -> dict[str, list]:
+    """
+    Lists whose entries are appended to their journal as they are added.
+    If `resume` they start with the entries already in the journals, otherwise these are cleared
+    """
+    lists: dict[str, list] = {}
+    for list_name in LIST_NAMES:
+        path = Path(JOURNAL_DIR, f"{list_name}.jsonl")
+        entries = []
+        if resume and path.exists():
+            entries = [entry for entry in (load_entry(list_name, json_data)
+                                           for json_data in serialization.load_json_lines(path))
+                       if entry is not None]
+        elif resume:
+            # Session saved before the journals existed
+            if list_name.startswith("doujin"):
+                old_entries = serializer.load_doujinshi_list(
+                    OUTPUT_DIR / list_name)
+            else:
+                old_entries = serializer.load_artist_list(
+                    OUTPUT_DIR / list_name)
+            writer = serialization.JsonLinesWriter(path, append=False)
+            lists[list_name] = serialization.JournaledList(writer)
+            lists[list_name].extend(old_entries)
+            continue
+        writer = serialization.JsonLinesWriter(path, append=resume)
+        lists[list_name] = serialization.JournaledList(writer, entries)
+    return lists
+
+
+def close_lists(lists: dict[str, list]):
+    for entries in lists.values():
+        if isinstance(entries, serialization.JournaledList):
+            entries.writer.close()
 
 
 def load_lists(config: hitomi.Config) -> dict:
-    lists = {}
+    lists = open_lists(config.search_is_incomplete)
     if config.search_is_incomplete:
         hitomi.Logger.log("Loading previous session\n")
-        lists["doujin_included"] = serializer.load_doujinshi_list(
-            OUTPUT_DIR / "doujin_included")
-        lists["doujin_excluded"] = serializer.load_doujinshi_list(
-            OUTPUT_DIR / "doujin_excluded")
-        lists["artist_included"] = serializer.load_artist_list(
-            OUTPUT_DIR / "artist_included")
-        lists["artist_excluded"] = serializer.load_artist_list(
-            OUTPUT_DIR / "doujin_excluded")
         hitomi.Logger.log(f"{len(config.seen_doujinshi)} seen doujin\n")
         hitomi.Logger.log(f'\tincluded: {len(lists["doujin_included"])}\n')
         hitomi.Logger.log(f'\texcluded: {len(lists["doujin_excluded"])}\n')
         hitomi.Logger.log("artists\n")
         hitomi.Logger.log(f'\tincluded: {len(lists["artist_included"])}\n')
         hitomi.Logger.log(f'\texcluded: {len(lists["artist_excluded"])}\n')
-    else:
-        lists["doujin_included"] = []
-        lists["doujin_excluded"] = []
-        lists["artist_included"] = []
-        lists["artist_excluded"] = []
     return lists
 
 
+def get_page_cache(config: hitomi.Config) -> hitomi.PageCache | None:
+    global page_cache
+    if page_cache is None and config.cache_max_megabytes > 0:
+        page_cache = hitomi.PageCache(CACHE_DIR,
+                                      config.cache_max_megabytes * 2**20,
+                                      config.cache_ttl_hours)
+    return page_cache
+
+
+def get_gallery_store() -> hitomi.GalleryStore:
+    global gallery_store
+    with stores_lock:
+        if gallery_store is None:
+            gallery_store = hitomi.GalleryStore(GALLERY_STORE_FILE)
+    return gallery_store
+
+
+def get_artist_store() -> hitomi.ArtistStore:
+    global artist_store
+    with stores_lock:
+        if artist_store is None:
+            artist_store = hitomi.ArtistStore(ARTIST_STORE_FILE)
+    return artist_store
+
+
+def create_navigator(config: hitomi.Config) -> hitomi.Navigator | hitomi.HttpNavigator:
+    return hitomi.create_navigator(config.backend, cache=get_page_cache(config))
+
+
+def create_pool(config: hitomi.Config, num_workers: int) -> hitomi.NavigatorPool:
+    return hitomi.NavigatorPool(num_workers, config.backend, cache=get_page_cache(config))
+
+
 def search_artist_page(config: hitomi.Config,
                        url: str,
-                       lists: dict = {},
+                       lists: dict | None = None,
                        from_homepage=False,
-                       navigator: hitomi.Navigator | None = None) -> bool:
+                       navigator: hitomi.Navigator | hitomi.HttpNavigator | None = None,
+                       verdict: hitomi.ArtistVerdict | None = None) -> bool:
+    """
+    Check the doujin in an artist or group page.
+    If `verdict` is given only the doujin newer than its last check are checked
+    and it's updated with the new ones
+    """
     if not lists:
+        lists = {}
         lists["doujin_included_list"] = []
         lists["doujin_excluded_list"] = []
-    seen_created_titles = set()
+    if verdict is None:
+        verdict = hitomi.ArtistVerdict(url)
+    seen_created_titles = verdict.created_titles
+    # Doujin older than this were checked by the last search
+    last_checked_date = verdict.newest_date
     can_add = False
     hitomi.Logger.log(f"\tSearching artist page: {url}\n")
     hitomi.Logger.log("\t\t")
     if navigator is None:
-        navigator = hitomi.Navigator()
-    iterator = hitomi.DoujinIterator(navigator, url)
+        navigator = create_navigator(config)
+    # Only list the doujin of the artist that pass the filters the site can apply
+    plan = hitomi.QueryPlan(config.filters, scope_url=url)
+    iterator = hitomi.create_iterator(navigator, plan.url)
     for i, doujin in iterator.next():
-        can_add_doujin = doujin.matches(config.filters)
-
+        if last_checked_date is not None and doujin.date < last_checked_date:
+            iterator.close()
+            break
+        if verdict.newest_date is None or doujin.date > verdict.newest_date:
+            verdict.newest_date = doujin.date
         # Doujin info in the normal list doesn't contain information
-        # on characters and groups. If you are filtering for it then get it from
-        # the specific doujin page, in which case you will need to reload
-        # the web elements when you get back since you changed the page
-        need_reload = False
-        if can_add_doujin and (config.filters.must_include_characters != 0 or len(doujin.artists) == 0):
-            iterator.get_extra_doujin_info(doujin)
-            can_add_doujin = doujin.matches(config.filters)
-            need_reload = True
+        # on characters and groups. If the filters need them then get them from
+        # the specific doujin page
+        result = evaluate_from_search_page(
+            config.filters, plan.matcher, doujin, needs_groups=False)
+        if result.decision == hitomi.UNDECIDED:
+            load_extra_doujin_info(navigator, doujin)
+            result = plan.matcher.evaluate(doujin)
+        can_add_doujin = fits_filters(doujin, result)
 
         if can_add_doujin:
             lists["doujin_included_list"].append(doujin)
@@ -152,160 +276,588 @@ def search_artist_page(config: hitomi.Config,
         if from_homepage and len(seen_created_titles) >= config.filters.artist_minimum_doujin_count:
             can_add = True
             break
-        if need_reload:
-            iterator.reload_page()
+    verdict.can_add = can_add
     return can_add
 
 
-def search_homepage(config: hitomi.Config,
-                    lists: dict[str, list]):
-    def check_artist_or_group(url: str):
-        # previous_url = hitomi.Navigator.get_current_url()
-        navigator.open_new_tab()
+def check_artist_or_group(navigator: hitomi.Navigator | hitomi.HttpNavigator,
+                          config: hitomi.Config,
+                          url: str) -> tuple[bool, float]:
+    """
+    Check if the artist or group in `url` has enough doujin that fit the user's preferences.
+    Returns the result and the seconds it took
+    """
+    start_time = time()
+    store = get_artist_store()
+    filters_fingerprint = hitomi.get_filters_fingerprint(config.filters)
+    verdict = store.get(url, filters_fingerprint)
+    if verdict.can_add:
+        # Doujin can't stop fitting the same filters
+        hitomi.Logger.log(f"\tAlready checked: {url}\n")
+        return True, time() - start_time
+    can_add = search_artist_page(
+        config, url, from_homepage=True, navigator=navigator, verdict=verdict)
+    store.save(verdict, filters_fingerprint)
+    return can_add, time() - start_time
 
-        can_add = search_artist_page(
-            config, url, from_homepage=True, navigator=navigator)
-        artist = hitomi.Artist(url)
 
-        # hitomi.Navigator.load(previous_url)
-        navigator.close_tab()
+class StopPoint():
+    """
+    Keeps the newest doujin of the search and finds where the last search started,
+    since all doujin from there on have already been seen.
+    With `incremental_sync` the last finished search of the same url is found by its highest
+    gallery id, otherwise by the stop datetime, only when searching for a series
+    """
+
+    def __init__(self, config: hitomi.Config, url: str):
+        self.config = config
+        self.url = url
+        self.is_enabled = not config.search_all and config.filters.must_include_series != ""
+        self.is_start = True
+        self.new_stop_datetime = config.stop_datetime
+        self.new_stop_title = str(config.stop_title)
+        # Doujin up to this gallery id were checked by the last finished search of `url`
+        self.high_water_mark = 0
+        if not config.search_all and config.incremental_sync:
+            self.high_water_mark = get_search_state().get_high_water_mark(url)
+        # Until a search of `url` finishes there's no mark, the stop datetime is used instead
+        self.is_incremental = self.high_water_mark > 0
+        if self.is_incremental:
+            hitomi.Logger.log(f"Only doujin after gallery {self.high_water_mark}\n")
+        self.new_high_water_mark = self.high_water_mark
+
+    @staticmethod
+    def get_gallery_id(doujin: hitomi.Doujinshi) -> int:
+        try:
+            return hitomi.to_gallery_id(doujin.url)
+        except ValueError:
+            return 0
+
+    def is_behind(self, doujin: hitomi.Doujinshi) -> bool:
+        """
+        Whether `doujin` was already checked by the last search, without moving the stop point
+        """
+        if self.is_incremental:
+            return 0 < self.get_gallery_id(doujin) <= self.high_water_mark
+        return self.is_enabled and doujin.date <= self.config.stop_datetime
 
-        type = "group" if "group" in url else "artist"
-        if can_add:
-            hitomi.Logger.log(f"\t\t+ {type}\n")
-            lists["artist_included"].append(artist)
+    def is_reached(self, doujin: hitomi.Doujinshi) -> bool:
+        gallery_id = self.get_gallery_id(doujin)
+        if self.is_incremental and self.is_behind(doujin):
+            hitomi.Logger.log(f"\tStop at gallery {gallery_id} {doujin.name}\n")
+            return True
+        self.new_high_water_mark = max(self.new_high_water_mark, gallery_id)
+        if self.is_incremental or not self.is_enabled:
+            return False
+        # Save date and title of the latest doujin
+        if self.is_start:
+            hitomi.Logger.log(f"\tNew stop daytime: {doujin.date}\n")
+            self.new_stop_datetime = doujin.date
+            self.new_stop_title = doujin.name
+            self.is_start = False
+        # Reached last updated date?
+        if doujin.date <= self.config.stop_datetime:
+            # Update date and exit
+            hitomi.Logger.log(f"\tStop at {doujin.date} {doujin.name}\n")
+            self.config.stop_datetime = self.new_stop_datetime
+            self.config.stop_title = self.new_stop_title
+            return True
+        return False
+
+    def resume(self, cursor: hitomi.CrawlCursor):
+        """
+        Keep the newest doujin found before the search was interrupted
+        """
+        if cursor.new_stop_datetime is not None:
+            self.new_stop_datetime = cursor.new_stop_datetime
+            self.new_stop_title = cursor.new_stop_title
+            self.is_start = False
+        self.new_high_water_mark = max(self.new_high_water_mark, cursor.new_high_water_mark)
+
+    def finish(self):
+        """
+        Every doujin up to the newest one was checked, the next search can stop there
+        """
+        if self.new_high_water_mark > 0:
+            get_search_state().save_high_water_mark(self.url, self.new_high_water_mark)
+
+
+def get_crawl_cursor(url: str, stop_point: StopPoint) -> hitomi.CrawlCursor:
+    """
+    Where the search of `url` was interrupted, or its first page if it wasn't
+    """
+    cursor = get_search_state().get_cursor()
+    if cursor is None or cursor.url != url:
+        return hitomi.CrawlCursor(url)
+    hitomi.Logger.log(
+        f"Resuming search at page {cursor.page_num} (doujin {cursor.index})\n")
+    stop_point.resume(cursor)
+    return cursor
+
+
+def save_crawl_cursor(cursor: hitomi.CrawlCursor, stop_point: StopPoint, page_num: int, index: int):
+    """
+    Save the position of the last doujin checked. The search resumes from the start of its page,
+    the doujin already seen there are skipped (and the ones pushed into it by new uploads)
+    """
+    cursor.page_num = page_num
+    cursor.index = index
+    if not stop_point.is_start:
+        cursor.new_stop_datetime = stop_point.new_stop_datetime
+        cursor.new_stop_title = stop_point.new_stop_title
+    cursor.new_high_water_mark = stop_point.new_high_water_mark
+    get_search_state().save_cursor(cursor)
+
+
+class DoujinPageStats():
+    """
+    Counts the doujin pages that had to be loaded to match doujin from search pages
+    and the ones that were avoided since the search page info was enough
+    """
+
+    def __init__(self):
+        self.loaded = 0
+        self.avoided = 0
+        self._lock = threading.Lock()
+
+    def add(self, filters: hitomi.Filters, doujin: hitomi.Doujinshi, result: hitomi.MatchResult):
+        # Doujin pages used to be loaded for every doujin that could fit the filters
+        # when characters were needed or it had no artists.
+        # The user's filters, the search's matcher doesn't check the characters the site searches for
+        would_load = result.decision != hitomi.EXCLUDE and (
+            len(filters.must_include_characters) != 0 or len(doujin.artists) == 0)
+        with self._lock:
+            if result.decision == hitomi.UNDECIDED:
+                self.loaded += 1
+            elif would_load:
+                self.avoided += 1
+
+    def log(self):
+        hitomi.Logger.log(
+            f"Doujin pages: {self.loaded} loaded, {self.avoided} avoided\n")
+
+
+# Doujin pages loaded and avoided during the search
+doujin_page_stats = DoujinPageStats()
+
+
+def evaluate_from_search_page(filters: hitomi.Filters,
+                              matcher: hitomi.CompiledFilters,
+                              doujin: hitomi.Doujinshi,
+                              needs_groups: bool) -> hitomi.MatchResult:
+    """
+    Match a doujin with the info shown in search pages, `matcher` has the `filters`
+    the search couldn't apply. It's undecided if its page has to be loaded to settle it,
+    or to get its groups when it fits, has no artists and `needs_groups`
+    """
+    result = matcher.evaluate(doujin, hitomi.LIST_PAGE_FIELDS)
+    if result.decision == hitomi.INCLUDE and needs_groups and len(doujin.artists) == 0:
+        result = hitomi.MatchResult(hitomi.UNDECIDED, missing_fields=["groups"])
+    doujin_page_stats.add(filters, doujin, result)
+    return result
+
+
+def fits_filters(doujin: hitomi.Doujinshi, result: hitomi.MatchResult) -> bool:
+    doujin.exclude_reasons.extend(result.exclude_reasons)
+    return result.decision == hitomi.INCLUDE
+
+
+def add_doujin_to_lists(config: hitomi.Config,
+                        lists: dict[str, list],
+                        doujin: hitomi.Doujinshi,
+                        doujin_fits_filter: bool,
+                        seen_artists: set[str]) -> list[str]:
+    """
+    Add a checked doujin to the included or excluded list.
+    Returns the urls of its artists (or groups) that haven't been checked yet
+    """
+    artist_urls: list[str] = []
+    if doujin_fits_filter:
+        includes_series_from_filter = config.filters.must_include_series in doujin.series
+        included_seen_series = [
+            name for name in doujin.series if name in config.seen_series]
+        is_original = (len(doujin.series) == 0) or (
+            doujin.series[0] == "original") or (doujin.series[0] == "n/a")
+        if is_original or includes_series_from_filter or len(included_seen_series) > 0:
+            lists["doujin_included"].append(doujin)
+            include_reason = ""
+            if is_original:
+                include_reason = "original doujin"
+            if includes_series_from_filter:
+                include_reason = "is from series {config.must_include_series}"
+            if len(included_seen_series) > 0:
+                include_reason = "is from seen series: {included_seen_series}"
+            hitomi.Logger.log(f"\t+ {include_reason}\n")
         else:
-            hitomi.Logger.log(f"\t\t- {type}\n")
-            lists["artist_excluded"].append(artist)
+            unread_series = []
+            for series_name in doujin.series:
+                if series_name not in config.seen_series:
+                    config.unread_series.add(series_name)
+                    unread_series.append(series_name)
+            exclude_reason = f"Unread series: {unread_series}"
+            hitomi.Logger.log(f"\t- {exclude_reason}\n")
+            doujin.exclude_reasons.append(exclude_reason)
+            lists["doujin_excluded"].append(doujin)
+        if config.check_artist:
+            if len(doujin.artists) > 0:
+                for artist_name in doujin.artists:
+                    if artist_name in seen_artists:
+                        if artist_name == "hase yuu":
+                            hitomi.Logger.log(
+                                f"\t+ hase yuu doujin: {doujin.name}\n")
+                            lists["doujin_included"].append(doujin)
+                        hitomi.Logger.log(
+                            f"\tArtist seen already: {artist_name}\n")
+                        continue
+                    seen_artists.add(artist_name)
+                    artist_urls.append(
+                        hitomi.get_url_from_artist_name(artist_name))
+            # No artist, check group instead
+            elif len(doujin.groups) > 0:
+                for group_name in doujin.groups:
+                    if group_name in seen_artists:
+                        hitomi.Logger.log(
+                            f"\tGroup seen already: {group_name}\n")
+                        continue
+                    seen_artists.add(group_name)
+                    artist_urls.append(
+                        hitomi.get_url_from_group_name(group_name))
+    # Add excluded doujin to separate list
+    else:
+        hitomi.Logger.log("\t- Cant add\n")
+        lists["doujin_excluded"].append(doujin)
+    return artist_urls
 
-        seen_artists.add(artist.name)
 
-    navigator = hitomi.Navigator()
+def add_artist_or_group(lists: dict[str, list], url: str, can_add: bool):
+    artist = hitomi.Artist(url)
+    type = "group" if "group" in url else "artist"
+    if can_add:
+        hitomi.Logger.log(f"\t\t+ {type}: {artist.name}\n")
+        lists["artist_included"].append(artist)
+    else:
+        hitomi.Logger.log(f"\t\t- {type}: {artist.name}\n")
+        lists["artist_excluded"].append(artist)
+
+
+def search_homepage(config: hitomi.Config,
+                    lists: dict[str, list]):
+    def queue_artists_and_groups(doujin: hitomi.Doujinshi, urls: list[str], page_num: int, index: int):
+        nonlocal check_seconds
+        checks: list[tuple[str, Future]] = []
+        for url in urls:
+            if pool is None:
+                navigator.open_new_tab()
+                can_add, seconds = check_artist_or_group(navigator, config, url)
+                navigator.close_tab()
+                check_seconds += seconds
+                add_artist_or_group(lists, url, can_add)
+            else:
+                checks.append((url, pool.submit(
+                    check_artist_or_group, config, url)))
+        queued_urls.add(doujin.url)
+        pending_checks.append((doujin, checks, page_num, index))
+        collect_artists_and_groups()
+
+    def collect_artists_and_groups(wait=False):
+        # Results are added in the order they were queued so the lists
+        # end up the same as if they were checked one at a time.
+        # A doujin is only seen once all of its checks are added,
+        # so the artists of an interrupted search are checked again when it's resumed
+        nonlocal check_seconds, wait_seconds
+        while len(pending_checks) > 0:
+            doujin, checks, page_num, index = pending_checks[0]
+            if not wait and not all(future.done() for _, future in checks):
+                return
+            for url, future in checks:
+                wait_start = time()
+                can_add, seconds = future.result()
+                wait_seconds += time() - wait_start
+                check_seconds += seconds
+                add_artist_or_group(lists, url, can_add)
+            pending_checks.popleft()
+            # Finished checking doujin, add it to seen list to ignore it later if it comes again
+            # Specially useful if the program crashes midway
+            config.seen_doujinshi.add(doujin.url)
+            save_crawl_cursor(cursor, stop_point, page_num, index)
+
+    navigator = create_navigator(config)
+    pool = None
+    if config.check_artist and config.num_workers > 0:
+        pool = create_pool(config, config.num_workers)
+    # Doujin waiting on their artist checks, with their page and index
+    pending_checks: deque[tuple[hitomi.Doujinshi,
+                                list[tuple[str, Future]], int, int]] = deque()
+    # Doujin already added to the lists during this search
+    queued_urls: set[str] = set()
+    start_time = time()
+    # Seconds spent checking artists and waiting on the workers to finish them
+    check_seconds = 0.0
+    wait_seconds = 0.0
 
-    url = hitomi.generate_url(config)
-    hitomi.Logger.log(f"Searching page: {url}\n")
+    plan = hitomi.QueryPlan(config.filters)
+    url = plan.url
+    hitomi.Logger.log(f"Searching page: {plan}\n")
 
     count = 0
-    lists = lists
-    config = config
-    is_start = True
-    new_stop_datetime = config.stop_datetime
-    new_stop_title = str(config.stop_title)
+    stop_point = StopPoint(config, url)
     seen_artists = set(config.added_artists)
+    cursor = get_crawl_cursor(url, stop_point)
 
-    iterator = hitomi.DoujinIterator(navigator, url)
-    for i, doujin in iterator.next():
-        need_reload = False
-        count += 1
-        hitomi.Logger.log(f"{i} ({count}): {doujin.name}\n")
-
-        if not config.search_all and config.filters.must_include_series != "":
-            # Save date and title of the latest doujin
-            if is_start:
-                hitomi.Logger.log(f"\tNew stop daytime: {doujin.date}\n")
-                new_stop_datetime = doujin.date
-                new_stop_title = doujin.name
-                is_start = False
-            # Reached last updated date?
-            # If so then all doujin from here on have already been seen
-            if doujin.date <= config.stop_datetime:
-                # Update date and exit
-                hitomi.Logger.log(f"\tStop at {doujin.date} {doujin.name}\n")
-                config.stop_datetime = new_stop_datetime
-                config.stop_title = new_stop_title
+    try:
+        iterator = hitomi.create_iterator(
+            navigator, url, config.get_prefetch_pages(), stop_point.high_water_mark)
+        for i, doujin in iterator.next(cursor.page_num):
+            count += 1
+            hitomi.Logger.log(f"{i} ({count}): {doujin.name}\n")
+
+            if stop_point.is_reached(doujin):
+                # Stop loading the next pages
+                iterator.close()
                 break
 
-        # Ignore doujin that have already been checked
-        if doujin.url in config.seen_doujinshi:
-            hitomi.Logger.log("\tskipped\n")
-            continue
+            # Ignore doujin that have already been checked
+            if doujin.url in config.seen_doujinshi or doujin.url in queued_urls:
+                hitomi.Logger.log("\tskipped\n")
+                continue
 
-        # See if can exclude doujin
-        doujin_fits_filter = doujin.matches(config.filters)
-        if doujin_fits_filter and (len(config.filters.must_include_characters) != 0
-                                   or len(doujin.artists) == 0):
-            # Can't exclude it yet? Look deeper and check again
-            iterator.get_extra_doujin_info(doujin)
-            need_reload = True
-            doujin_fits_filter = doujin.matches(config.filters)
-
-        if doujin_fits_filter:
-            includes_series_from_filter = config.filters.must_include_series in doujin.series
-            included_seen_series = [
-                name for name in doujin.series if name in config.seen_series]
-            is_original = (len(doujin.series) == 0) or (
-                doujin.series[0] == "original") or (doujin.series[0] == "n/a")
-            if is_original or includes_series_from_filter or len(included_seen_series) > 0:
-                lists["doujin_included"].append(doujin)
-                include_reason = ""
-                if is_original:
-                    include_reason = "original doujin"
-                if includes_series_from_filter:
-                    include_reason = "is from series {config.must_include_series}"
-                if len(included_seen_series) > 0:
-                    include_reason = "is from seen series: {included_seen_series}"
-                hitomi.Logger.log(f"\t+ {include_reason}\n")
-            else:
-                unread_series = []
-                for series_name in doujin.series:
-                    if series_name not in config.seen_series:
-                        config.unread_series.add(series_name)
-                        unread_series.append(series_name)
-                exclude_reason = f"Unread series: {unread_series}"
-                hitomi.Logger.log(f"\t- {exclude_reason}\n")
-                doujin.exclude_reasons.append(exclude_reason)
-                lists["doujin_excluded"].append(doujin)
-            if config.check_artist:
-                if len(doujin.artists) > 0:
-                    for artist_name in doujin.artists:
-                        if artist_name in seen_artists:
-                            if artist_name == "hase yuu":
-                                hitomi.Logger.log(
-                                    f"\t+ hase yuu doujin: {doujin.name}\n")
-                                lists["doujin_included"].append(doujin)
-                            hitomi.Logger.log(
-                                f"\tArtist seen already: {artist_name}\n")
-                            continue
-                        artist_url = hitomi.get_url_from_artist_name(
-                            artist_name)
-                        check_artist_or_group(artist_url)
-                # No artist, check group instead
-                elif len(doujin.groups) > 0:
-                    for group_name in doujin.groups:
-                        if group_name in seen_artists:
-                            hitomi.Logger.log(
-                                f"\tGroup seen already: {group_name}\n")
-                            continue
-                        group_url = hitomi.get_url_from_group_name(
-                            group_name)
-                        check_artist_or_group(group_url)
-        # Add excluded doujin to separate list
-        else:
-            hitomi.Logger.log("\t- Cant add\n")
-            lists["doujin_excluded"].append(doujin)
+            # See if can exclude doujin
+            # Groups name the bookmarks of doujin without artists
+            result = evaluate_from_search_page(
+                config.filters, plan.matcher, doujin, needs_groups=True)
+            if result.decision == hitomi.UNDECIDED:
+                # Can't settle it yet? Look deeper and check again
+                hitomi.Logger.log(
+                    f"\tLoading doujin page for {result.missing_fields}\n")
+                load_extra_doujin_info(navigator, doujin)
+                result = plan.matcher.evaluate(doujin)
+            doujin_fits_filter = fits_filters(doujin, result)
 
-        # Finished checking doujin, add it to seen list to ignore it later if it comes again
-        # Specially useful if the program crashes midway
-        config.seen_doujinshi.add(doujin.url)
-        if need_reload:
-            iterator.reload_page()
-
-    if len(config.unread_series) != 0:
-        going_to_read = []
-        with open("later.txt") as f:
-            going_to_read = [line.rstrip() for line in f]
-        going_to_read = set(going_to_read)
-        if len(going_to_read) == 0:
-            hitomi.Logger.log(f"Unread Series:{config.unread_series}\n")
-        else:
-            hitomi.Logger.log(
-                f"Unread Series:{config.unread_series.difference(going_to_read)}\n")
+            artist_urls = add_doujin_to_lists(config, lists, doujin,
+                                              doujin_fits_filter, seen_artists)
+            queue_artists_and_groups(doujin, artist_urls, iterator.page_num, i)
+        collect_artists_and_groups(wait=True)
+    except BaseException as e:
+        if isinstance(e, KeyboardInterrupt):
+            # Keep the checks that already finished, the rest are done again when resumed
+            collect_artists_and_groups()
+        if pool is not None:
+            pool.shutdown(wait=False)
+        raise
+    if pool is not None:
+        pool.shutdown()
+    stop_point.finish()
+    get_search_state().clear_cursor()
+
+    if check_seconds > 0:
+        elapsed_seconds = time() - start_time
+        # Time the search would have taken checking artists one at a time
+        serial_seconds = elapsed_seconds
+        if pool is not None:
+            serial_seconds += check_seconds - wait_seconds
+        hitomi.Logger.log(
+            f"Artist checks took {timedelta(seconds=int(check_seconds))} "
+            f"with {config.num_workers if pool else 0} workers, search took "
+            f"{timedelta(seconds=int(elapsed_seconds))} "
+            f"({serial_seconds / elapsed_seconds:.2f}x speed-up)\n")
+
+    log_unread_series(config)
+
+
+def log_unread_series(config: hitomi.Config):
+    if len(config.unread_series) == 0:
+        return
+    going_to_read = []
+    with open("later.txt") as f:
+        going_to_read = [line.rstrip() for line in f]
+    going_to_read = set(going_to_read)
+    if len(going_to_read) == 0:
+        hitomi.Logger.log(f"Unread Series:{sorted(config.unread_series)}\n")
+    else:
+        hitomi.Logger.log(
+            f"Unread Series:{sorted(config.unread_series.difference(going_to_read))}\n")
+
+
+def load_search_page(navigator: hitomi.Navigator | hitomi.HttpNavigator,
+                     url: str,
+                     page_num: int,
+                     min_gallery_id=0) -> tuple[tuple[hitomi.Doujinshi, ...], int]:
+    """
+    Load a page of a search. Returns its doujin and the number of pages
+    """
+    iterator = hitomi.create_iterator(
+        navigator, url, min_gallery_id=min_gallery_id)
+    doujin_list = iterator.load_doujin_list(page_num)
+    assert iterator.num_pages is not None
+    return doujin_list, iterator.num_pages
+
+
+def load_extra_doujin_info(navigator: hitomi.Navigator | hitomi.HttpNavigator,
+                           doujin: hitomi.Doujinshi):
+    """
+    Add the groups and characters of `doujin`, only loading its page
+    if it isn't in the gallery store yet
+    """
+    store = get_gallery_store()
+    stored_doujin = store.get_by_url(doujin.url)
+    if stored_doujin is not None:
+        # Replaced, not added, the http backend's doujin already have them
+        doujin.groups = list(stored_doujin.groups)
+        doujin.characters = list(stored_doujin.characters)
+        return
+    if navigator.load_extra_doujin_info(doujin):
+        store.upsert(doujin)
+
+
+async def crawl_homepage(config: hitomi.Config,
+                         lists: dict[str, list]):
+    """
+    Same search as `search_homepage`, but search pages, doujin info and artist checks
+    run as tasks on a pool of navigators, at most `config.max_concurrency` at a time.
+    Doujin are still added to the lists in the order of the search so the lists
+    end up the same.
+
+    A doujin is only added to `seen_doujinshi` once all of its artists have been checked,
+    so when the crawl is cancelled (Ctrl-C) the lists and config dumped afterwards
+    can be resumed without losing any artist
+    """
+    async def run_blocking(task: Callable[..., Any], *args):
+        async with semaphore:
+            return await asyncio.wrap_future(pool.submit(task, *args))
 
+    def start(coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coroutine)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return task
 
-def check_seen_series_link():
+    def is_seen(doujin: hitomi.Doujinshi) -> bool:
+        return doujin.url in config.seen_doujinshi or doujin.url in checked_urls
+
+    def collect_artists_and_groups():
+        # Same order as they were queued, a doujin is seen once all of its checks are added
+        while len(pending_checks) > 0 and all(task.done() for _, task in pending_checks[0][1]):
+            doujin, checks = pending_checks.popleft()
+            for artist_url, task in checks:
+                can_add, _ = task.result()
+                add_artist_or_group(lists, artist_url, can_add)
+            config.seen_doujinshi.add(doujin.url)
+            page_num, index = doujin_positions.pop(doujin.url)
+            save_crawl_cursor(cursor, stop_point, page_num, index)
+
+    async def crawl_page(doujin_list: tuple[hitomi.Doujinshi, ...], page_num: int) -> bool:
+        """
+        Add the doujin in a search page to the lists.
+        Returns whether the stop point was reached
+        """
+        nonlocal count
+        # Load the info of every doujin in the page that needs it at once
+        results: dict[int, hitomi.MatchResult] = {}
+        info_tasks: dict[int, asyncio.Task] = {}
+        for i, doujin in enumerate(doujin_list):
+            if stop_point.is_behind(doujin):
+                break
+            if is_seen(doujin):
+                continue
+            # Groups name the bookmarks of doujin without artists
+            results[i] = evaluate_from_search_page(
+                config.filters, plan.matcher, doujin, needs_groups=True)
+            if results[i].decision == hitomi.UNDECIDED:
+                info_tasks[i] = start(run_blocking(
+                    load_extra_doujin_info, doujin))
+
+        for i, doujin in enumerate(doujin_list):
+            count += 1
+            hitomi.Logger.log(f"{i} ({count}): {doujin.name}\n")
+            if stop_point.is_reached(doujin):
+                return True
+            if is_seen(doujin):
+                hitomi.Logger.log("\tskipped\n")
+                continue
+            result = results[i]
+            if i in info_tasks:
+                await info_tasks.pop(i)
+                result = plan.matcher.evaluate(doujin)
+            doujin_fits_filter = fits_filters(doujin, result)
+            artist_urls = add_doujin_to_lists(config, lists, doujin,
+                                              doujin_fits_filter, seen_artists)
+            checks = [(artist_url, start(run_blocking(check_artist_or_group, config, artist_url)))
+                      for artist_url in artist_urls]
+            checked_urls.add(doujin.url)
+            doujin_positions[doujin.url] = (page_num, i)
+            pending_checks.append((doujin, checks))
+            collect_artists_and_groups()
+        return False
+
+    pool = create_pool(config, config.max_concurrency)
+    semaphore = asyncio.Semaphore(config.max_concurrency)
+    tasks: set[asyncio.Task] = set()
+    pending_checks: deque[tuple[hitomi.Doujinshi,
+                                list[tuple[str, asyncio.Task]]]] = deque()
+    # Doujin already added to the lists during this crawl
+    checked_urls: set[str] = set()
+    # Page and index of the doujin waiting on their checks
+    doujin_positions: dict[str, tuple[int, int]] = {}
+    start_time = time()
+
+    plan = hitomi.QueryPlan(config.filters)
+    url = plan.url
+    hitomi.Logger.log(f"Crawling page: {plan}\n")
+    count = 0
+    stop_point = StopPoint(config, url)
+    seen_artists = set(config.added_artists)
+    cursor = get_crawl_cursor(url, stop_point)
+    # Pages loaded ahead of the one being crawled
+    lookahead = max(config.get_prefetch_pages(), 1)
+    page_tasks: dict[int, asyncio.Task] = {}
+
+    try:
+        page_num = cursor.page_num
+        doujin_list, num_pages = await run_blocking(
+            load_search_page, url, page_num, stop_point.high_water_mark)
+        while True:
+            last_page_ahead = min(page_num + lookahead, num_pages)
+            for next_page_num in range(page_num + 1, last_page_ahead + 1):
+                if next_page_num not in page_tasks:
+                    page_tasks[next_page_num] = start(run_blocking(
+                        load_search_page, url, next_page_num, stop_point.high_water_mark))
+            hitomi.Logger.log(f"Page {page_num}/{num_pages}\n")
+            # The search may have fewer pages than when it was interrupted
+            if await crawl_page(doujin_list, page_num) or page_num >= num_pages:
+                break
+            page_num += 1
+            doujin_list, _ = await page_tasks.pop(page_num)
+        for _, checks in pending_checks:
+            await asyncio.gather(*(task for _, task in checks))
+        collect_artists_and_groups()
+        stop_point.finish()
+        get_search_state().clear_cursor()
+    except asyncio.CancelledError:
+        # Keep the checks that already finished
+        collect_artists_and_groups()
+        hitomi.Logger.log_warn(
+            f"Crawl cancelled, {len(pending_checks)} doujin were waiting on artist checks\n")
+        raise
+    finally:
+        # Only left over if the crawl failed or was cancelled
+        is_finished = len(tasks) == 0
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        pool.shutdown(wait=is_finished)
+
+    hitomi.Logger.log(
+        f"Crawled {count} doujin in {timedelta(seconds=int(time() - start_time))} "
+        f"with up to {config.max_concurrency} tasks at a time\n")
+    log_unread_series(config)
+
+
+def check_seen_series_link(backend: str | None = None):
     config = load_config()
+    if backend:
+        config.backend = backend
     try:
-        navigator = hitomi.Navigator()
+        navigator = create_navigator(config)
         correct_series_names = set()
         incorrect_series_names = []
         num_series = len(config.seen_series)
@@ -327,12 +879,17 @@ def check_seen_series_link():
         print_exception(e)
 
 
-def search_doujin(config: hitomi.Config):
+def search_doujin(config: hitomi.Config, use_async=False):
     lists = load_lists(config)
     start_time = time()
     try:
         config.search_is_incomplete = True
-        search_homepage(config, lists)
+        # So the journals are resumed even if the search is killed
+        dump_config_file(config)
+        if use_async:
+            asyncio.run(crawl_homepage(config, lists))
+        else:
+            search_homepage(config, lists)
         dump_lists(lists)
         bookmarks.export_lists(lists["doujin_included"],
                                lists["artist_included"],
@@ -352,20 +909,114 @@ def search_doujin(config: hitomi.Config):
         dump_lists(lists)
         dump_config_file(config)
         print_exception(e)
+    finally:
+        close_lists(lists)
     elapsed_seconds = time() - start_time
     hitomi.Logger.log(
         f"Total time: {timedelta(seconds=elapsed_seconds)}\n")
+    doujin_page_stats.log()
+    if page_cache is not None:
+        page_cache.log_stats()
+
+
+def query_catalog(text: str):
+    """
+    Print the doujin of past searches that match `text`
+    ("artist:name tag:some_tag title words"), without loading any page
+    """
+    start_time = time()
+    catalog = hitomi.GalleryCatalog(CATALOG_FILE)
+    if len(catalog) == 0:
+        hitomi.Logger.log("Empty catalog, adding the output lists\n")
+        catalog.close()
+        add_lists_to_catalog({
+            "doujin_included": serializer.load_doujinshi_list(OUTPUT_DIR / "doujin_included"),
+            "doujin_excluded": serializer.load_doujinshi_list(OUTPUT_DIR / "doujin_excluded"),
+        })
+        catalog = hitomi.GalleryCatalog(CATALOG_FILE)
+    doujin_list = catalog.search(hitomi.CatalogQuery(text))
+    for doujin in doujin_list:
+        hitomi.Logger.log(f"{doujin}\n")
+    hitomi.Logger.log(
+        f"{len(doujin_list)} of {len(catalog)} doujin in {(time() - start_time) * 1000:.1f} ms\n")
+    catalog.close()
+
+
+def refilter(config: hitomi.Config):
+    """
+    Check the doujin of past searches again with the current filters and export them,
+    without loading any page. Artists and groups are checked with the doujin
+    of theirs that were found, and their last verdict with the same filters
+    """
+    if config.search_is_incomplete:
+        # Its lists are only in the journals and output until it's finished
+        hitomi.Logger.log_warn(
+            "The last search was interrupted, finish it before refiltering\n")
+        return
+    start_time = time()
+    catalog = hitomi.GalleryCatalog(CATALOG_FILE)
+    doujin_list = catalog.search(hitomi.CatalogQuery())
+    catalog.close()
+    hitomi.Logger.log(f"Refiltering {len(doujin_list)} doujin\n")
+    gallery_store = get_gallery_store()
+    artist_store = get_artist_store()
+    filters_fingerprint = hitomi.get_filters_fingerprint(config.filters)
+    matcher = hitomi.CompiledFilters(config.filters)
+    lists: dict[str, list] = {list_name: [] for list_name in LIST_NAMES}
+    # Only logged, the stored unread series are the ones found by the searches
+    config.unread_series = set()
+    seen_artists = set(config.added_artists)
+    created_titles: dict[str, set[str]] = {}
+    artist_urls: list[str] = []
+    for doujin in doujin_list:
+        stored_doujin = gallery_store.get_by_url(doujin.url)
+        if stored_doujin is not None:
+            doujin.groups = list(stored_doujin.groups)
+            doujin.characters = list(stored_doujin.characters)
+        # The catalog has every field, the ones whose page wasn't loaded are empty
+        result = matcher.evaluate(doujin)
+        can_add_doujin = fits_filters(doujin, result)
+        if can_add_doujin and not doujin.could_be_anthology():
+            creator_urls = [hitomi.get_url_from_artist_name(name) for name in doujin.artists]
+            if len(creator_urls) == 0:
+                creator_urls = [hitomi.get_url_from_group_name(name) for name in doujin.groups]
+            for url in creator_urls:
+                created_titles.setdefault(url, set()).add(doujin.name)
+        artist_urls.extend(add_doujin_to_lists(
+            config, lists, doujin, can_add_doujin, seen_artists))
+    for url in artist_urls:
+        verdict = artist_store.get(url, filters_fingerprint)
+        titles = created_titles.get(url, set()) | verdict.created_titles
+        add_artist_or_group(lists, url, verdict.can_add or len(
+            titles) >= config.filters.artist_minimum_doujin_count)
+    # The catalog already has them
+    dump_lists(lists, add_to_catalog=False)
+    catalog = hitomi.GalleryCatalog(CATALOG_FILE)
+    catalog.set_included(lists["doujin_included"], True)
+    catalog.set_included(lists["doujin_excluded"], False)
+    catalog.close()
+    bookmarks.export_lists(lists["doujin_included"],
+                           lists["artist_included"],
+                           config.filters.must_include_series)
+    log_unread_series(config)
+    hitomi.Logger.log(
+        f"Refiltered in {timedelta(seconds=time() - start_time)}\n")
 
 
 def backup_files():
     if not Path.is_dir(OUTPUT_DIR):
         return
-    Path("output-backup").mkdir(exist_ok=True)
+    OUTPUT_BACKUP_DIR.mkdir(exist_ok=True)
     for file in OUTPUT_DIR.iterdir():
         src = file
         dst = OUTPUT_BACKUP_DIR.joinpath(file.name)
-        shutil.copy(src, dst)
-    shutil.copy(CONFIG_FILE, CONFIG_BACKUP_FILE)
+        if file.is_dir():
+            # The journals
+            shutil.copytree(src, dst, dirs_exist_ok=True)
+        else:
+            shutil.copy(src, dst)
+    # The serializer adds the extension
+    shutil.copy(f"{CONFIG_FILE}.json", CONFIG_BACKUP_FILE)
 
 
 def look_for_all_series():
@@ -387,6 +1038,7 @@ def look_for_all_series():
             num_doujins = len(lists["doujin_included"])
             bookmarks.export_lists(lists["doujin_included"],
                                    lists["artist_included"])
+            close_lists(lists)
             config.search_is_incomplete = False
             config.seen_doujinshi.clear()
             config.unread_series.clear()
@@ -414,19 +1066,37 @@ def main():
                         help="check if links in seen_series are correct")
     parser.add_argument("--series",
                         help="Search only for doujinshi in the given series")
+    parser.add_argument("--backend", choices=hitomi.BACKENDS,
+                        help="How to load pages, overrides 'backend' in config.json")
+    parser.add_argument("--async", action="store_true", dest="use_async",
+                        help="Crawl with concurrent tasks, up to 'max_concurrency' in config.json")
+    parser.add_argument("--refilter", action="store_true",
+                        help="Filter the doujin of past searches again with config.json and export them, without loading any page")
+    parser.add_argument("--query",
+                        help="Look up the doujin of past searches, e.g. \"artist:name tag:some_tag title words\"")
     args = parser.parse_args()
     if args.logfile:
         hitomi.Logger.start_logger()
     else:
         hitomi.Logger.use_terminal()
     if args.check:
-        check_seen_series_link()
+        check_seen_series_link(args.backend)
+    elif args.query is not None:
+        query_catalog(args.query)
+    elif args.refilter:
+        backup_files()
+        config = load_config()
+        if args.series:
+            config.filters.must_include_series = args.series
+        refilter(config)
     else:
         backup_files()
         config = load_config()
+        if args.backend:
+            config.backend = args.backend
         if args.series:
             config.filters.must_include_series = args.series
-        search_doujin(config)
+        search_doujin(config, args.use_async)
     if args.logfile:
         hitomi.Logger.stop_logger()
 
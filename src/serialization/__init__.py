@@ -1,2 +1,3 @@
 from .json import JsonSerializer
 from .yaml import YamlSerializer
+from .jsonl import JsonLinesWriter, JournaledList, load_json_lines
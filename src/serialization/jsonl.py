@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+from pathlib import Path
+from time import monotonic
+from typing import Any, Iterable, Iterator
+
+from hitomi import Logger
+
+
+class JsonLinesWriter():
+    """
+    Appends entries to a JSON Lines file, one json object per line.
+    Lines are flushed to disk every `sync_every` entries or `sync_seconds` seconds,
+    even if nothing else is written, so a crash only loses the entries since the last sync
+    """
+
+    def __init__(self, path: Path, append=True, sync_every=100, sync_seconds=5.0):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.sync_every = sync_every
+        self.sync_seconds = sync_seconds
+        self._lock = threading.Lock()
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        self._unsynced = 0
+        self._last_sync = monotonic()
+        # Syncs the entries left when the search stalls (loading a page, checking an artist)
+        self._timer: threading.Timer | None = None
+
+    def write(self, entry: Any):
+        line = json.dumps(entry.toJSON(), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line)
+            self._file.write("\n")
+            self._unsynced += 1
+            seconds_left = self.sync_seconds - (monotonic() - self._last_sync)
+            if self._unsynced >= self.sync_every or seconds_left <= 0:
+                self._sync()
+            elif self._timer is None:
+                self._timer = threading.Timer(seconds_left, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _sync(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = monotonic()
+
+    def sync(self):
+        with self._lock:
+            if not self._file.closed and self._unsynced > 0:
+                self._sync()
+            elif self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._sync()
+            self._file.close()
+
+
+def load_json_lines(path: Path) -> Iterator[dict]:
+    """
+    Read the entries of a JSON Lines file one at a time.
+    A line cut off by a crash is skipped
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    Logger.log_warn(f"Skipping broken line in {path}\n")
+    except FileNotFoundError:
+        return
+
+
+class JournaledList(list):
+    """
+    List that also writes every entry added to it to a JSON Lines journal
+    """
+
+    def __init__(self, writer: JsonLinesWriter, entries: Iterable = ()):
+        # Entries given here are already in the journal
+        super().__init__(entries)
+        self.writer = writer
+
+    def append(self, entry):
+        super().append(entry)
+        self.writer.write(entry)
+
+    def extend(self, entries: Iterable):
+        for entry in entries:
+            self.append(entry)
@@ -0,0 +1,72 @@
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.joinpath("src")))
+
+import hitomi  # noqa: E402
+import main  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).parent.joinpath("fixtures")
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="session")
+def ltn_url():
+    """
+    Url of a local server with the gallery data in fixtures/ltn, same as tools/fixture_server.py
+    """
+    handler = partial(QuietHandler, directory=str(FIXTURES_DIR.joinpath("ltn")))
+    server = ThreadingHTTPServer(("localhost", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def terminal_logger():
+    hitomi.Logger.use_terminal()
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """
+    main.py with its output, config and data files inside `tmp_path`
+    """
+    paths = {
+        "OUTPUT_DIR": tmp_path.joinpath("output"),
+        "OUTPUT_BACKUP_DIR": tmp_path.joinpath("output-backup"),
+        "JOURNAL_DIR": tmp_path.joinpath("output", "journal"),
+        "CONFIG_FILE": tmp_path.joinpath("config"),
+        "CONFIG_BACKUP_FILE": tmp_path.joinpath("config-backup.json"),
+        "CACHE_DIR": tmp_path.joinpath("cache"),
+        "DATA_DIR": tmp_path.joinpath("data"),
+        "GALLERY_STORE_FILE": tmp_path.joinpath("data", "galleries.sqlite"),
+        "ARTIST_STORE_FILE": tmp_path.joinpath("data", "artists.sqlite"),
+        "CATALOG_FILE": tmp_path.joinpath("data", "catalog.sqlite"),
+        "SEARCH_STATE_FILE": tmp_path.joinpath("data", "state.sqlite"),
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(main, name, path)
+    monkeypatch.setattr(main, "BROWSER_NAME", None)
+    monkeypatch.chdir(tmp_path)
+    # log_unread_series reads it from the working directory
+    tmp_path.joinpath("later.txt").write_text("")
+    yield main
+    for store in [main.gallery_store, main.artist_store, main.search_state]:
+        if store is not None:
+            store.close()
+    main.gallery_store = None
+    main.artist_store = None
+    main.search_state = None
+    main.page_cache = None
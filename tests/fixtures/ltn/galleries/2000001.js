@@ -0,0 +1 @@
+var galleryinfo = {"id": "2000001", "title": "First Snow", "type": "doujinshi", "language": "japanese", "galleryurl": "/doujinshi/first-snow-日本語-2000001.html", "artists": [{"artist": "ito"}], "groups": null, "parodys": [{"parody": "original"}], "characters": null, "tags": [{"tag": "sole female", "female": "1", "male": ""}], "date": "2023-08-05 09:10:00-05"}
\ No newline at end of file
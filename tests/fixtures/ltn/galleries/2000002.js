@@ -0,0 +1 @@
+var galleryinfo = {"id": "2000002", "title": "Quiet Library", "type": "doujinshi", "language": "japanese", "galleryurl": "/doujinshi/quiet-library-日本語-2000002.html", "artists": null, "groups": [{"group": "circle a"}], "parodys": [{"parody": "original"}], "characters": null, "tags": [{"tag": "glasses", "female": "1", "male": ""}, {"tag": "shotacon", "female": "", "male": "1"}], "date": "2023-08-06 17:45:00-05"}
\ No newline at end of file
@@ -0,0 +1 @@
+var galleryinfo = {"id": "2000003", "title": "Game Collection", "type": "gamecg", "language": "japanese", "galleryurl": "/gamecg/game-collection-日本語-2000003.html", "artists": [{"artist": "ito"}], "groups": null, "parodys": [{"parody": "original"}], "characters": null, "tags": [], "date": "2023-08-07 10:00:00-05"}
\ No newline at end of file
@@ -0,0 +1 @@
+var galleryinfo = {"id": "2000004", "title": "Sword Art Memories", "type": "doujinshi", "language": "japanese", "galleryurl": "/doujinshi/sword-art-memories-日本語-2000004.html", "artists": [{"artist": "kanda"}, {"artist": "mori"}], "groups": [{"group": "circle b"}], "parodys": [{"parody": "sword art online"}], "characters": [{"character": "asuna yuuki"}], "tags": [{"tag": "stockings", "female": "1", "male": ""}], "date": "2023-08-08 21:15:00-05"}
\ No newline at end of file
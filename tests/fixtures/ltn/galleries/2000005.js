@@ -0,0 +1 @@
+var galleryinfo = {"id": "2000005", "title": "Rainy Day Notes", "type": "manga", "language": "japanese", "galleryurl": "/manga/rainy-day-notes-日本語-2000005.html", "artists": [{"artist": "mori"}], "groups": null, "parodys": [{"parody": "original"}], "characters": null, "tags": [{"tag": "schoolgirl uniform", "female": "1", "male": ""}, {"tag": "guro", "female": "", "male": ""}], "date": "2023-08-09 08:00:00-05"}
\ No newline at end of file
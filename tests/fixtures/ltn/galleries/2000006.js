@@ -0,0 +1 @@
+var galleryinfo = {"id": "2000006", "title": "Summer Festival", "type": "doujinshi", "language": "japanese", "galleryurl": "/doujinshi/summer-festival-日本語-2000006.html", "artists": [{"artist": "kanda"}], "groups": [{"group": "circle a"}], "parodys": [{"parody": "original"}], "characters": null, "tags": [{"tag": "sole female", "female": "1", "male": ""}], "date": "2023-08-10 12:30:00-05"}
\ No newline at end of file
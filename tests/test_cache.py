@@ -0,0 +1,20 @@
+import hitomi
+from hitomi.cache import get_page_kind
+
+
+def test_page_kinds():
+    assert get_page_kind("https://hitomi.la") == "search"
+    assert get_page_kind(hitomi.QueryPlan(hitomi.Filters()).url) == "search"
+    assert get_page_kind("https://hitomi.la/doujinshi/sword-art-memories-日本語-2000004.html") == "gallery"
+    assert get_page_kind("https://ltn.hitomi.la/galleries/2000004.js") == "gallery"
+    assert get_page_kind(hitomi.get_url_from_artist_name("kanda")) == "artist"
+    assert get_page_kind("https://ltn.hitomi.la/n/artist/kanda-japanese.nozomi") == "artist"
+
+
+def test_artist_and_group_searches_are_artist_pages():
+    filters = hitomi.Filters()
+    for scope_url in [hitomi.get_url_from_artist_name("kanda"), hitomi.get_url_from_group_name("circle a")]:
+        url = hitomi.QueryPlan(filters, scope_url=scope_url).url
+        assert "search.html?" in url
+        assert get_page_kind(url) == "artist"
+        assert get_page_kind(f"{url}#2") == "artist"
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+import hitomi
+
+URL = "https://hitomi.la/doujinshi/sword-art-memories-日本語-2000004.html"
+
+
+def make_doujin() -> hitomi.Doujinshi:
+    doujin = hitomi.Doujinshi()
+    doujin.url = URL
+    doujin.name = "Sword Art Memories"
+    doujin.type = "doujinshi"
+    doujin.artists = ["kanda", "mori"]
+    doujin.groups = ["circle b"]
+    doujin.series = ["sword art online"]
+    doujin.characters = ["asuna yuuki"]
+    doujin.tags = ["stockings ♀"]
+    doujin.date = datetime(2023, 8, 8, 21, 15)
+    return doujin
+
+
+def test_store_and_catalog_read_back_the_same_doujin(tmp_path):
+    store = hitomi.GalleryStore(tmp_path.joinpath("galleries.sqlite"))
+    catalog = hitomi.GalleryCatalog(tmp_path.joinpath("catalog.sqlite"))
+    store.upsert(make_doujin())
+    catalog.add(make_doujin(), included=True)
+    expected = make_doujin().toJSON()
+    assert store.get_by_url(URL).toJSON() == expected
+    assert [doujin.toJSON() for doujin in catalog.search(hitomi.CatalogQuery("artist:mori female:stockings sword"))] == [expected]
+    assert catalog.search(hitomi.CatalogQuery("artist:kanda type:manga")) == []
+    store.close()
+    catalog.close()
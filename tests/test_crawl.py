@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+import hitomi
+import hitomi.api
+
+
+SUMMER_FESTIVAL = "https://hitomi.la/doujinshi/summer-festival-日本語-2000006.html"
+SWORD_ART_MEMORIES = "https://hitomi.la/doujinshi/sword-art-memories-日本語-2000004.html"
+QUIET_LIBRARY = "https://hitomi.la/doujinshi/quiet-library-日本語-2000002.html"
+FIRST_SNOW = "https://hitomi.la/doujinshi/first-snow-日本語-2000001.html"
+
+
+@pytest.fixture
+def crawler(workspace, ltn_url, monkeypatch):
+    monkeypatch.setattr(hitomi.api, "LTN_URL", ltn_url)
+    # Two search pages: Summer Festival, Sword Art Memories | Quiet Library, First Snow
+    monkeypatch.setattr(hitomi.api, "PAGE_SIZE", 2)
+    return workspace
+
+
+def make_config(workspace, **fields) -> hitomi.Config:
+    config = workspace.load_config()
+    config.backend = "http"
+    config.filters.must_exclude_type = {"game cg"}
+    config.filters.must_exclude_tags = {"guro"}
+    for key, value in fields.items():
+        setattr(config, key, value)
+    return config
+
+
+def new_lists(workspace) -> dict[str, list]:
+    return {name: [] for name in workspace.LIST_NAMES}
+
+
+def crawl(workspace, config: hitomi.Config, lists: dict[str, list], use_async: bool):
+    if use_async:
+        asyncio.run(workspace.crawl_homepage(config, lists))
+    else:
+        workspace.search_homepage(config, lists)
+
+
+def get_urls(lists: dict[str, list]) -> dict[str, list[str]]:
+    return {name: sorted(item.url for item in items) for name, items in lists.items()}
+
+
+def test_async_and_serial_searches_make_the_same_lists(crawler, monkeypatch):
+    serial_lists = new_lists(crawler)
+    crawl(crawler, make_config(crawler, num_workers=0), serial_lists, use_async=False)
+    # Check the artists again instead of reusing their verdicts
+    crawler.get_artist_store().close()
+    monkeypatch.setattr(crawler, "artist_store", None)
+    monkeypatch.setattr(crawler, "ARTIST_STORE_FILE", crawler.ARTIST_STORE_FILE.with_name("async_artists.db"))
+    async_lists = new_lists(crawler)
+    crawl(crawler, make_config(crawler, max_concurrency=4), async_lists, use_async=True)
+    assert get_urls(serial_lists) == get_urls(async_lists)
+    assert get_urls(serial_lists) == {
+        "doujin_included": [FIRST_SNOW, QUIET_LIBRARY, SUMMER_FESTIVAL],
+        # Unread series
+        "doujin_excluded": [SWORD_ART_MEMORIES],
+        "artist_included": ["https://hitomi.la/artist/kanda-japanese.html"],
+        "artist_excluded": ["https://hitomi.la/artist/ito-japanese.html",
+                            "https://hitomi.la/artist/mori-japanese.html",
+                            "https://hitomi.la/group/circle a-japanese.html"],
+    }
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_second_incremental_search_finds_no_new_doujin(crawler, use_async):
+    config = make_config(crawler, check_artist=False, incremental_sync=True)
+    lists = new_lists(crawler)
+    crawl(crawler, config, lists, use_async)
+    assert len(lists["doujin_included"]) + len(lists["doujin_excluded"]) == 4
+    url = hitomi.QueryPlan(config.filters).url
+    assert crawler.get_search_state().get_high_water_mark(url) == 2000006
+    # Nothing was uploaded since, and nothing is skipped for being seen
+    config = make_config(crawler, check_artist=False, incremental_sync=True)
+    lists = new_lists(crawler)
+    crawl(crawler, config, lists, use_async)
+    assert get_urls(lists) == get_urls(new_lists(crawler))
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_interrupted_search_resumes_from_the_cursor(crawler, monkeypatch, capsys, use_async):
+    added_urls: list[str] = []
+    interrupt_url = FIRST_SNOW
+    add_doujin_to_lists = crawler.add_doujin_to_lists
+
+    def add_until_interrupted(config, lists, doujin, doujin_fits_filter, seen_artists):
+        if doujin.url == interrupt_url:
+            raise KeyboardInterrupt
+        added_urls.append(doujin.url)
+        return add_doujin_to_lists(config, lists, doujin, doujin_fits_filter, seen_artists)
+
+    monkeypatch.setattr(crawler, "add_doujin_to_lists", add_until_interrupted)
+    # Without artist checks every doujin is seen as soon as it's added
+    config = make_config(crawler, check_artist=False)
+    url = hitomi.QueryPlan(config.filters).url
+    lists = new_lists(crawler)
+    with pytest.raises(KeyboardInterrupt):
+        crawl(crawler, config, lists, use_async)
+    cursor = crawler.get_search_state().get_cursor()
+    assert cursor is not None
+    assert (cursor.url, cursor.page_num, cursor.index) == (url, 2, 0)
+
+    # Resumed with the seen doujin and lists dumped by `search_doujin`
+    added_urls.clear()
+    interrupt_url = None
+    capsys.readouterr()
+    crawl(crawler, config, lists, use_async)
+    output = capsys.readouterr().out
+    assert "Resuming search at page 2 (doujin 0)\n" in output
+    assert "Summer Festival" not in output
+    assert added_urls == [FIRST_SNOW]
+    assert crawler.get_search_state().get_cursor() is None
+    assert get_urls(lists)["doujin_included"] == [FIRST_SNOW, QUIET_LIBRARY, SUMMER_FESTIVAL]
+    assert get_urls(lists)["doujin_excluded"] == [SWORD_ART_MEMORIES]
+
+
+def test_artist_verdict_is_reused_until_the_filters_change(crawler, monkeypatch):
+    searched_urls: list[str] = []
+    search_artist_page = crawler.search_artist_page
+
+    def count_searches(config, url, *args, **kwargs):
+        searched_urls.append(url)
+        return search_artist_page(config, url, *args, **kwargs)
+
+    monkeypatch.setattr(crawler, "search_artist_page", count_searches)
+    config = make_config(crawler)
+    artist_url = hitomi.get_url_from_artist_name("kanda")
+    navigator = crawler.create_navigator(config)
+    try:
+        assert crawler.check_artist_or_group(navigator, config, artist_url)[0]
+        assert crawler.check_artist_or_group(navigator, config, artist_url)[0]
+        assert searched_urls == [artist_url]
+        config.filters.must_exclude_tags.add("netorare")
+        assert crawler.check_artist_or_group(navigator, config, artist_url)[0]
+        assert searched_urls == [artist_url, artist_url]
+    finally:
+        navigator.quit()
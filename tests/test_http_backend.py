@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+
+import hitomi
+import hitomi.api
+
+
+@pytest.fixture
+def navigator(ltn_url, monkeypatch):
+    monkeypatch.setattr(hitomi.api, "LTN_URL", ltn_url)
+    navigator = hitomi.HttpNavigator(max_connections=2)
+    yield navigator
+    navigator.quit()
+
+
+def make_filters() -> hitomi.Filters:
+    filters = hitomi.Filters()
+    filters.must_exclude_type = {"game cg"}
+    filters.must_exclude_tags = {"guro"}
+    return filters
+
+
+def test_search_applies_the_site_filters(navigator):
+    url = hitomi.QueryPlan(make_filters()).url
+    # Newest first, without the game cg (2000003) and the guro one (2000005)
+    assert navigator.search(url) == [2000006, 2000004, 2000002, 2000001]
+
+
+def test_iterator_pages_through_the_search(navigator, monkeypatch):
+    monkeypatch.setattr(hitomi.api, "PAGE_SIZE", 3)
+    url = hitomi.QueryPlan(make_filters()).url
+    iterator = hitomi.create_iterator(navigator, url)
+    doujin_list = [doujin for _, doujin in iterator.next()]
+    assert iterator.num_pages == 2
+    assert [doujin.name for doujin in doujin_list] == [
+        "Summer Festival", "Sword Art Memories", "Quiet Library", "First Snow"]
+
+
+def test_gallery_data_is_converted_like_the_site_shows_it(navigator):
+    url = "https://hitomi.la/doujinshi/sword-art-memories-日本語-2000004.html"
+    doujin = navigator.load_doujin(url)
+    assert doujin.url == url
+    assert doujin.name == "Sword Art Memories"
+    assert doujin.type == "doujinshi"
+    assert doujin.artists == ["kanda", "mori"]
+    assert doujin.groups == ["circle b"]
+    assert doujin.series == ["sword art online"]
+    assert doujin.characters == ["asuna yuuki"]
+    assert doujin.tags == ["stockings ♀"]
+    # Local time, like the site
+    assert doujin.date == datetime.fromisoformat("2023-08-08T21:15:00-05:00").astimezone().replace(tzinfo=None)
+
+
+def test_tags_type_and_missing_lists(navigator):
+    doujin_list = navigator.load_doujin_list([2000003, 2000002])
+    assert doujin_list[0].type == "game cg"
+    # Lists the gallery data leaves null
+    assert doujin_list[0].groups == []
+    assert doujin_list[0].characters == []
+    assert doujin_list[1].tags == ["glasses ♀", "shotacon ♂"]
+    assert doujin_list[1].groups == ["circle a"]
+
+
+def test_artist_pages(navigator):
+    url = hitomi.get_url_from_artist_name("kanda")
+    assert navigator.can_load_url(url)
+    assert not navigator.can_load_url(hitomi.get_url_from_artist_name("nobody"))
+    doujin_list = [doujin for _, doujin in hitomi.create_iterator(navigator, url).next()]
+    assert [doujin.name for doujin in doujin_list] == ["Summer Festival", "Sword Art Memories"]
+
+
+def test_tags_the_site_does_not_have(navigator):
+    filters = make_filters()
+    # Not a tag of the site, as some of the default ones
+    filters.must_exclude_tags.add("beastiality")
+    assert navigator.search(hitomi.QueryPlan(filters).url) == [2000006, 2000004, 2000002, 2000001]
+    filters.must_include_tags = {"beastiality"}
+    assert navigator.search(hitomi.QueryPlan(filters).url) == []
+    # The default filters
+    assert navigator.search(hitomi.QueryPlan(hitomi.Filters()).url) == [2000006, 2000004, 2000002, 2000001]
+
+
+def test_galleries_without_data_are_skipped(navigator):
+    doujin_list = navigator.load_doujin_list([2000004, 2999999, 2000002])
+    assert [doujin.name for doujin in doujin_list] == ["Sword Art Memories", "Quiet Library"]
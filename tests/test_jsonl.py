@@ -0,0 +1,20 @@
+from time import sleep
+
+import serialization
+import serialization.jsonl
+
+import hitomi
+
+
+def test_entries_are_synced_while_the_search_stalls(tmp_path, monkeypatch):
+    synced: list[int] = []
+    monkeypatch.setattr(serialization.jsonl.os, "fsync", synced.append)
+    writer = serialization.JsonLinesWriter(tmp_path.joinpath("doujin_included.jsonl"), sync_seconds=0.2)
+    writer.write(hitomi.Artist("https://hitomi.la/artist/kanda-japanese.html"))
+    assert synced == []
+    # Nothing else is written
+    sleep(0.5)
+    assert len(synced) == 1
+    writer.close()
+    assert len(synced) == 2
+    assert len(list(serialization.load_json_lines(tmp_path.joinpath("doujin_included.jsonl")))) == 1
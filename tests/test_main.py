@@ -0,0 +1,141 @@
+from datetime import datetime
+
+import hitomi
+
+
+def make_doujin(name: str, gallery_id: int, **fields) -> hitomi.Doujinshi:
+    doujin = hitomi.Doujinshi()
+    doujin.name = name
+    doujin.url = f"https://hitomi.la/doujinshi/{name.lower().replace(' ', '-')}-日本語-{gallery_id}.html"
+    doujin.type = "doujinshi"
+    doujin.date = datetime(2023, 8, 1)
+    for key, value in fields.items():
+        setattr(doujin, key, value)
+    return doujin
+
+
+def test_stored_info_is_not_added_twice(workspace):
+    workspace.get_gallery_store().upsert(make_doujin(
+        "Summer Festival", 2000006, groups=["circle a"], characters=["asuna yuuki"]))
+    # The http backend's doujin already come with their groups and characters
+    doujin = make_doujin("Summer Festival", 2000006, groups=["circle a"], characters=["asuna yuuki"])
+    navigator = hitomi.HttpNavigator()
+    workspace.load_extra_doujin_info(navigator, doujin)
+    navigator.quit()
+    assert doujin.groups == ["circle a"]
+    assert doujin.characters == ["asuna yuuki"]
+
+
+def add_to_catalog(workspace, doujin_list: list[hitomi.Doujinshi]):
+    catalog = hitomi.GalleryCatalog(workspace.CATALOG_FILE)
+    catalog.add_all(doujin_list, included=True)
+    catalog.close()
+
+
+def load_output(workspace, list_name: str) -> list[str]:
+    return [doujin.name for doujin in workspace.serializer.load_doujinshi_list(workspace.OUTPUT_DIR / list_name)]
+
+
+def test_refilter_reads_every_field_of_the_catalog(workspace):
+    # Neither is in the gallery store, only in the catalog
+    add_to_catalog(workspace, [
+        make_doujin("Summer Festival", 2000006, series=["original"], characters=["asuna yuuki"]),
+        make_doujin("Rainy Day Notes", 2000002, series=["original"], characters=["kirito"]),
+    ])
+    config = workspace.load_config()
+    config.check_artist = False
+    config.filters.must_include_characters = {"asuna yuuki"}
+    workspace.refilter(config)
+    assert load_output(workspace, "doujin_included") == ["Summer Festival"]
+    assert load_output(workspace, "doujin_excluded") == ["Rainy Day Notes"]
+
+
+def test_refilter_keeps_the_stored_unread_series(workspace):
+    add_to_catalog(workspace, [make_doujin("Summer Festival", 2000006, series=["sword art online"])])
+    config = workspace.load_config()
+    config.check_artist = False
+    config.unread_series.add("frieren")
+    workspace.refilter(config)
+    assert load_output(workspace, "doujin_excluded") == ["Summer Festival"]
+    stored_config = hitomi.Config()
+    workspace.get_search_state().load(stored_config)
+    assert set(stored_config.unread_series) == {"frieren"}
+
+
+def test_refilter_leaves_an_interrupted_search(workspace):
+    add_to_catalog(workspace, [make_doujin("Summer Festival", 2000006, series=["original"])])
+    config = workspace.load_config()
+    lists = workspace.open_lists(resume=False)
+    lists["doujin_included"].append(make_doujin("First Snow", 2000001))
+    workspace.close_lists(lists)
+    journal = workspace.JOURNAL_DIR.joinpath("doujin_included.jsonl").read_bytes()
+    config.search_is_incomplete = True
+    workspace.refilter(config)
+    assert workspace.JOURNAL_DIR.joinpath("doujin_included.jsonl").read_bytes() == journal
+    assert not workspace.OUTPUT_DIR.joinpath("doujin_included").exists()
+
+
+def test_session_after_a_journaled_one(workspace):
+    config = workspace.load_config()
+    lists = workspace.load_lists(config)
+    lists["doujin_included"].append(make_doujin("Summer Festival", 2000006))
+    workspace.close_lists(lists)
+    workspace.dump_config_file(config)
+    # The output folder now has the journals in it
+    workspace.backup_files()
+    assert workspace.OUTPUT_BACKUP_DIR.joinpath("journal", "doujin_included.jsonl").exists()
+    workspace.backup_files()
+    config = workspace.load_config()
+    assert workspace.load_lists(config)["doujin_included"] == []
+
+
+def test_resume_only_sees_the_checked_doujin(workspace):
+    config = workspace.load_config()
+    config.search_is_incomplete = True
+    lists = workspace.load_lists(config)
+    checked = make_doujin("Summer Festival", 2000006)
+    lists["doujin_included"].append(checked)
+    config.seen_doujinshi.add(checked.url)
+    # Interrupted before its artists were checked
+    lists["doujin_included"].append(make_doujin("First Snow", 2000001))
+    workspace.close_lists(lists)
+    workspace.dump_config_file(config)
+    config = workspace.load_config()
+    lists = workspace.load_lists(config)
+    assert len(lists["doujin_included"]) == 2
+    assert checked.url in config.seen_doujinshi
+    assert len(config.seen_doujinshi) == 1
+
+
+def test_doujin_without_artists_load_their_groups(workspace, monkeypatch):
+    monkeypatch.setattr(workspace, "doujin_page_stats", workspace.DoujinPageStats())
+    filters = hitomi.Filters()
+    filters.must_include_characters = {"asuna yuuki"}
+    plan = hitomi.QueryPlan(filters)
+    with_artists = make_doujin("Summer Festival", 2000006, artists=["kanda"])
+    without_artists = make_doujin("First Snow", 2000001)
+    assert workspace.evaluate_from_search_page(
+        filters, plan.matcher, with_artists, needs_groups=True).decision == hitomi.INCLUDE
+    result = workspace.evaluate_from_search_page(filters, plan.matcher, without_artists, needs_groups=True)
+    assert result.decision == hitomi.UNDECIDED
+    assert result.missing_fields == ["groups"]
+    # The characters are searched by the site, their pages used to be loaded for them
+    assert workspace.doujin_page_stats.avoided == 1
+    assert workspace.doujin_page_stats.loaded == 1
+
+
+def test_pages_are_only_prefetched_in_a_second_browser_when_asked(workspace):
+    config = workspace.load_config()
+    assert config.get_prefetch_pages() == 0
+    config.backend = "http"
+    assert config.get_prefetch_pages() == 1
+    config = hitomi.Config.fromJSON({"backend": "browser", "prefetch_pages": 2})
+    assert config.get_prefetch_pages() == 2
+    assert hitomi.Config.fromJSON(hitomi.Config().toJSON()).prefetch_pages is None
+
+
+def test_unread_series_are_logged_as_a_list(workspace, capsys):
+    config = workspace.load_config()
+    config.unread_series.update(["sword art online", "frieren"])
+    workspace.log_unread_series(config)
+    assert "Unread Series:['frieren', 'sword art online']\n" in capsys.readouterr().out
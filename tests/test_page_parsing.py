@@ -0,0 +1,94 @@
+from datetime import datetime
+from os import getenv
+import json
+
+import pytest
+
+import hitomi
+from conftest import FIXTURES_DIR
+from hitomi.navigator import DoujinListPage
+
+PAGES_DIR = FIXTURES_DIR.joinpath("pages")
+GALLERY_URL = "https://hitomi.la/doujinshi/sword-art-memories-日本語-2000004.html"
+LIST_URL = "https://hitomi.la/index-japanese.html"
+
+
+def read_fixture(name: str) -> str:
+    return PAGES_DIR.joinpath(name).read_text(encoding="utf-8")
+
+
+class ScriptNavigator():
+    """
+    Stands in for a browser that already ran the list page script on the fixture
+    """
+
+    def __init__(self, data: dict):
+        self.data = data
+        self.cache = None
+
+    def load(self, url: str):
+        pass
+
+    def find_all(self, selector: str, wait=False):
+        return []
+
+    def execute_script(self, script: str, *args):
+        return self.data
+
+
+def test_gallery_page():
+    doujin = hitomi.DoujinPage(GALLERY_URL, html=read_fixture("gallery.html")).load_doujin()
+    assert doujin.url == GALLERY_URL
+    assert doujin.name == "Sword Art Memories"
+    assert doujin.type == "doujinshi"
+    assert doujin.series == ["sword art online"]
+    assert doujin.artists == ["kanda", "mori"]
+    assert doujin.groups == ["circle b"]
+    assert doujin.characters == ["asuna yuuki", "kirito"]
+    # Entities and line breaks read the same as the rendered text
+    assert doujin.tags == ["stockings ♀", "glasses ♂", "full color & more"]
+    assert doujin.date == datetime(2023, 8, 8, 21, 15)
+
+
+def test_gallery_page_blank_fields():
+    doujin = hitomi.DoujinPage(GALLERY_URL, html=read_fixture("gallery_blank_fields.html")).load_doujin()
+    assert doujin.name == "Quiet Library"
+    assert doujin.type == "manga"
+    assert doujin.series == []
+    assert doujin.artists == []
+    assert doujin.groups == []
+    assert doujin.characters == []
+    assert doujin.tags == []
+    assert doujin.date == datetime(2017, 9, 30, 23, 14)
+
+
+def test_list_page():
+    page = DoujinListPage(ScriptNavigator(json.loads(read_fixture("list_page.json"))), LIST_URL)
+    page.try_loading()
+    first, second = page.doujin_list
+    assert first.name == "Summer Festival"
+    assert first.url.endswith("-2000006.html")
+    assert first.type == "doujinshi"
+    assert first.artists == ["kanda"]
+    assert first.series == ["original"]
+    assert first.tags == ["sole female ♀"]
+    assert first.date == datetime(2023, 8, 10, 12, 30)
+    assert second.name == "Rainy Day Notes"
+    assert second.type == "manga"
+    assert second.artists == []
+    assert second.series == []
+    assert second.tags == ["schoolgirl uniform ♀", "shotacon ♂"]
+    assert second.date == datetime(2017, 9, 30, 23, 14)
+    assert page.get_num_pages() == 41
+
+
+@pytest.mark.skipif(not getenv("HITOMI_BROWSER_TESTS"),
+                    reason="Set HITOMI_BROWSER_TESTS=1 to run the list page script in a browser")
+def test_list_page_script_matches_fixture():
+    navigator = hitomi.Navigator()
+    try:
+        navigator.browser.get(PAGES_DIR.joinpath("list_page.html").as_uri())
+        data = DoujinListPage(navigator, LIST_URL).extract_page_data()
+    finally:
+        navigator.quit()
+    assert data == json.loads(read_fixture("list_page.json"))
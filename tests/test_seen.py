@@ -0,0 +1,40 @@
+import hitomi
+
+URL = "https://hitomi.la/doujinshi/sword-art-memories-日本語-2000004.html"
+
+
+def test_urls_and_ids_are_the_same_gallery():
+    seen = hitomi.GallerySet([URL, 2000001])
+    assert 2000004 in seen
+    assert "https://hitomi.la/doujinshi/first-snow-日本語-2000001.html" in seen
+    assert 2000002 not in seen
+    assert seen.update([2000004, 2000002, 70000]) == [2000002, 70000]
+    assert len(seen) == 4
+    # Sorted, across chunks
+    assert list(seen) == [70000, 2000001, 2000002, 2000004]
+    seen.discard(URL)
+    seen.discard(2000003)
+    assert list(seen) == [70000, 2000001, 2000002]
+
+
+def test_urls_without_a_gallery_id_are_skipped():
+    seen = hitomi.GallerySet()
+    seen.add("")
+    seen.add("https://hitomi.la/index-japanese.html")
+    assert seen.update(["", URL]) == [2000004]
+    seen.discard("")
+    assert "" not in seen
+    assert list(seen) == [2000004]
+
+
+def test_stored_set_skips_them_too(tmp_path):
+    state = hitomi.SearchState(tmp_path.joinpath("state.sqlite"))
+    config = hitomi.Config()
+    state.load(config)
+    config.seen_doujinshi.add("")
+    config.seen_doujinshi.add(URL)
+    config.seen_doujinshi.discard("")
+    stored_config = hitomi.Config()
+    state.load(stored_config)
+    assert list(stored_config.seen_doujinshi) == [2000004]
+    state.close()
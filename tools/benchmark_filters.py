@@ -0,0 +1,103 @@
+from argparse import ArgumentParser
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+import random
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent.joinpath("src")))
+
+import hitomi  # noqa: E402
+
+# Matches synthetic galleries with the old per-doujin nested loops
+# and with the compiled filters, and checks both give the same results
+
+
+def matches_nested_loops(doujin: hitomi.Doujinshi, filter: hitomi.Filters) -> bool:
+    def CommonItems(lst, items):
+        common = []
+        for item in items:
+            for element in lst:
+                if item == element:
+                    common.append(item)
+                    break
+        return common
+
+    def MissingItems(lst, items):
+        missing = []
+        for item in items:
+            is_included = False
+            for element in lst:
+                if item == element:
+                    is_included = True
+                    break
+            if not is_included:
+                missing.append(item)
+        return missing
+
+    exclude_reasons = []
+    if any(t == doujin.type for t in filter.must_exclude_type):
+        exclude_reasons.append(f"Is of type {doujin.type}")
+    forbidden_tags = CommonItems(doujin.tags, filter.must_exclude_tags)
+    if len(forbidden_tags) > 0:
+        exclude_reasons.append(f"Contains tags {forbidden_tags}")
+    missing_tags = MissingItems(doujin.tags, filter.must_include_tags)
+    if len(missing_tags) > 0:
+        exclude_reasons.append(f"Doesn't contain tags {missing_tags}")
+    if filter.must_include_series and filter.must_include_series not in doujin.series:
+        exclude_reasons.append(
+            f"Doesn't contain series {filter.must_include_series}")
+    missing_characters = MissingItems(
+        doujin.characters, filter.must_include_characters)
+    if len(missing_characters) > 0:
+        exclude_reasons.append(
+            f"Doesn't contain characters {missing_characters}")
+    if filter.max_num_artists > 0 and len(doujin.artists) > filter.max_num_artists:
+        exclude_reasons.append(f"More than {filter.max_num_artists} artists")
+    return len(exclude_reasons) == 0
+
+
+def generate_doujin_list(count: int, seed: int) -> list[hitomi.Doujinshi]:
+    random.seed(seed)
+    filters = hitomi.Filters()
+    tags = sorted(filters.must_exclude_tags) + [f"tag {i}" for i in range(400)]
+    types = ["doujinshi", "manga", "artist cg", "game cg"]
+    doujin_list = []
+    for i in range(count):
+        doujin = hitomi.Doujinshi()
+        doujin.url = f"https://hitomi.la/doujinshi/title-{i}.html"
+        doujin.name = f"title {i}"
+        doujin.type = random.choice(types)
+        doujin.artists = [f"artist {random.randrange(5000)}"
+                          for _ in range(random.choice([0, 1, 1, 1, 2, 3]))]
+        doujin.series = random.choice([[], ["original"], [f"series {random.randrange(300)}"]])
+        doujin.characters = [f"character {random.randrange(1000)}"
+                             for _ in range(random.randrange(4))]
+        doujin.tags = random.sample(tags, random.randrange(5, 30))
+        doujin.date = datetime(2020, 1, 1)
+        doujin_list.append(doujin)
+    return doujin_list
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark matching doujin against the filters")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    filters = hitomi.Filters()
+    filters.must_include_tags = {"tag 1"}
+    doujin_list = generate_doujin_list(args.count, args.seed)
+
+    start = perf_counter()
+    before = [matches_nested_loops(doujin, filters) for doujin in doujin_list]
+    before_seconds = perf_counter() - start
+    print(f"nested loops: {before_seconds:.2f}s")
+
+    start = perf_counter()
+    matcher = hitomi.CompiledFilters(filters)
+    after = matcher.match_batch(doujin_list)
+    after_seconds = perf_counter() - start
+    print(f"compiled filters: {after_seconds:.2f}s ({before_seconds / after_seconds:.1f}x faster)")
+
+    print(f"{sum(after)} of {len(after)} doujin fit the filters")
+    print(f"Same results: {before == after}")
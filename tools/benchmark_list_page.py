@@ -0,0 +1,89 @@
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent.joinpath("src")))
+
+from selenium.webdriver.common.by import By  # noqa: E402
+
+import hitomi  # noqa: E402
+from hitomi.navigator import ConvertDatetime, DoujinListPage  # noqa: E402
+
+# Counts the round trips to chromedriver needed to extract a search page with
+# the old per-element queries and with the single script call
+
+
+def load_doujin_list_per_element(navigator: hitomi.Navigator) -> list[hitomi.Doujinshi]:
+    def get_children_link_text(parent):
+        children = []
+        for child in parent.find_elements(By.TAG_NAME, "a"):
+            text = child.get_attribute("textContent")
+            if text != "...":
+                children.append(text.lower())
+        return children
+
+    titles = navigator.find_all(".lillie a", wait=True)
+    series = navigator.find_all(
+        "//table[@class='dj-desc']/tbody/tr[1]/td[2]", By.XPATH)
+    types = navigator.find_all(
+        "//table[@class='dj-desc']/tbody/tr[2]/td[2]", By.XPATH)
+    artists = navigator.find_all(".artist-list")
+    tags = navigator.find_all(".relatedtags")
+    dates = navigator.find_all(".date")
+    doujin_list = []
+    for i, _ in enumerate(titles):
+        doujin = hitomi.Doujinshi()
+        doujin.name = titles[i].text
+        doujin.url = titles[i].get_attribute("href")
+        doujin.type = types[i].text.lower()
+        doujin.artists = get_children_link_text(artists[i])
+        doujin.series = get_children_link_text(series[i])
+        doujin.tags = get_children_link_text(tags[i])
+        doujin.date = ConvertDatetime(dates[i].text)
+        doujin_list.append(doujin)
+    return doujin_list
+
+
+class RoundTripCounter():
+    def __init__(self, navigator: hitomi.Navigator):
+        assert (navigator.browser != None)
+        self.count = 0
+        execute = navigator.browser.execute
+
+        def counted_execute(*args, **kwargs):
+            self.count += 1
+            return execute(*args, **kwargs)
+        navigator.browser.execute = counted_execute
+
+
+def measure(name: str, counter: RoundTripCounter, extract):
+    counter.count = 0
+    start = perf_counter()
+    doujin_list = extract()
+    elapsed = perf_counter() - start
+    print(f"{name}: {len(doujin_list)} doujin, {counter.count} round trips, {elapsed:.2f}s")
+    return doujin_list
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark search page extraction")
+    parser.add_argument("url", nargs="?", default="https://hitomi.la/search.html?language%3Ajapanese")
+    args = parser.parse_args()
+    hitomi.Logger.use_terminal()
+    navigator = hitomi.Navigator()
+    counter = RoundTripCounter(navigator)
+
+    def load_per_element():
+        navigator.load(args.url)
+        return load_doujin_list_per_element(navigator)
+
+    def load_single_script():
+        # Loads the page too, like the per element one
+        page = DoujinListPage(navigator, args.url)
+        page.try_loading()
+        return page.doujin_list
+    before = measure("per element", counter, load_per_element)
+    after = measure("single script", counter, load_single_script)
+    same = [d.toJSON() for d in before] == [d.toJSON() for d in after]
+    print(f"Same doujin: {same}")
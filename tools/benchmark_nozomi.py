@@ -0,0 +1,84 @@
+from argparse import ArgumentParser
+from array import array
+from pathlib import Path
+from time import perf_counter
+import sys
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.joinpath("src")))
+
+import hitomi  # noqa: E402
+from hitomi.nozomi import get_nozomi_paths  # noqa: E402
+
+# Compares searching the site's gallery id lists with python sets, as the 'http' backend
+# used to, and with numpy. The lists are made up, newest first like the site's
+
+
+def generate_lists(paths: list[str], num_galleries: int, seed: int) -> dict[str, bytes]:
+    rng = np.random.default_rng(seed)
+    all_ids = np.sort(rng.choice(4_000_000, num_galleries, replace=False))[::-1]
+    lists = {}
+    for path in paths:
+        if path.startswith("n/index-"):
+            ids = all_ids
+        else:
+            # Each tag, type, etc is in a few percent of the galleries
+            fraction = rng.uniform(0.005, 0.2)
+            ids = all_ids[rng.random(num_galleries) < fraction]
+        lists[path] = ids.astype(">u4").tobytes()
+    return lists
+
+
+def search_with_sets(url: str, lists: dict[str, bytes]) -> list[int]:
+    def load_gallery_ids(path: str) -> list[int]:
+        gallery_ids = array("I", lists[path])
+        if sys.byteorder == "little":
+            gallery_ids.byteswap()
+        return gallery_ids.tolist()
+
+    include, exclude = get_nozomi_paths(url)
+    gallery_ids = load_gallery_ids(include[0])
+    for path in include[1:]:
+        included_ids = set(load_gallery_ids(path))
+        gallery_ids = [id for id in gallery_ids if id in included_ids]
+    excluded_ids: set[int] = set()
+    for path in exclude:
+        excluded_ids.update(load_gallery_ids(path))
+    return [id for id in gallery_ids if id not in excluded_ids]
+
+
+def search_with_numpy(url: str, lists: dict[str, bytes]) -> list[int]:
+    return hitomi.NozomiIndex(lists.__getitem__).search(url).tolist()
+
+
+def measure(search, url: str, lists: dict[str, bytes], repeat: int) -> tuple[float, list[int]]:
+    best_seconds = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        gallery_ids = search(url, lists)
+        best_seconds = min(best_seconds, perf_counter() - start)
+    return best_seconds, gallery_ids
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark searching the gallery id lists")
+    parser.add_argument("--galleries", type=int, default=600_000,
+                        help="Number of galleries in the language's index")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    # Default filters list the whole language's index, with a tag only the galleries that have it
+    tag_filters = hitomi.Filters()
+    tag_filters.must_include_tags = {"sole female ♀"}
+    for filters in [hitomi.Filters(), tag_filters]:
+        url = hitomi.QueryPlan(filters).url
+        include, exclude = get_nozomi_paths(url)
+        lists = generate_lists(include + exclude, args.galleries, args.seed)
+        print(f"{include}, {len(exclude)} excluded lists, "
+              f"{sum(map(len, lists.values())) / 2**20:.1f} MB")
+        set_seconds, set_ids = measure(search_with_sets, url, lists, args.repeat)
+        numpy_seconds, numpy_ids = measure(search_with_numpy, url, lists, args.repeat)
+        print(f"\tsets: {set_seconds * 1000:.0f} ms, numpy: {numpy_seconds * 1000:.0f} ms "
+              f"({set_seconds / numpy_seconds:.1f}x faster), {len(numpy_ids)} galleries")
+        print(f"\tSame ids: {set_ids == numpy_ids}")
@@ -0,0 +1,104 @@
+from argparse import ArgumentParser
+from datetime import datetime
+from hashlib import md5
+from pathlib import Path
+from time import perf_counter
+import json
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent.joinpath("src")))
+
+import hitomi  # noqa: E402
+from benchmark_filters import generate_doujin_list  # noqa: E402
+
+# Loads and dumps doujin records with the old __dict__ based class
+# and with the slotted one, and checks both give the same json
+
+
+def get_deep_size(root) -> int:
+    """
+    Bytes used by `root` and everything it references, counting shared objects once
+    """
+    seen: set[int] = set()
+    size = 0
+    stack = [root]
+    while len(stack) > 0:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+        elif hasattr(obj, "__slots__"):
+            stack.extend(getattr(obj, name) for name in obj.__slots__)
+    return size
+
+
+class DictDoujinshi:
+    def __init__(self):
+        self.url = ""
+        self.name = ""
+        self.type = ""
+        self.groups: list[str] = []
+        self.artists: list[str] = []
+        self.series: list[str] = []
+        self.characters: list[str] = []
+        self.tags: list[str] = []
+        self.date = datetime(1900, 1, 1)
+        self.exclude_reasons: list[str] = []
+
+    def toJSON(self):
+        my_dict = dict(self.__dict__)
+        my_dict = {k: v for k, v in my_dict.items() if v}
+        my_dict['date'] = self.date.strftime('%d %b %Y, %H:%M')
+        return my_dict
+
+    @classmethod
+    def fromJSON(cls, json_data: dict):
+        if len(json_data.keys()) == 0:
+            return None
+        doujinshi = DictDoujinshi()
+        for key in json_data:
+            if not hasattr(doujinshi, key):
+                continue
+            data = json_data[key]
+            correct_type = type(getattr(doujinshi, key))
+            if correct_type == datetime:
+                setattr(doujinshi, key, datetime.strptime(
+                    data, '%d %b %Y, %H:%M'))
+            else:
+                setattr(doujinshi, key, data)
+        return doujinshi
+
+
+def measure(name: str, record_class, json_list: list[dict]):
+    start = perf_counter()
+    records = [record_class.fromJSON(json_data) for json_data in json_list]
+    load_seconds = perf_counter() - start
+    start = perf_counter()
+    dumped = [record.toJSON() for record in records]
+    dump_seconds = perf_counter() - start
+    size = get_deep_size(records)
+    print(f"{name}: load {load_seconds:.2f}s, dump {dump_seconds:.2f}s, {size / 2**20:.1f} MB")
+    # Only keep a hash so both record lists don't have to fit in memory at once
+    return md5(json.dumps(dumped, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark loading and dumping doujin records")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    # Same as reading doujin_included.json, every record gets its own strings
+    json_list = json.loads(json.dumps([doujin.toJSON() for doujin in generate_doujin_list(args.count, args.seed)],
+                                      ensure_ascii=False))
+    print(f"{len(json_list)} records")
+    before = measure("__dict__", DictDoujinshi, json_list)
+    after = measure("__slots__", hitomi.Doujinshi, json_list)
+    print(f"Same json: {before == after}")
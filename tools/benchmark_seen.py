@@ -0,0 +1,83 @@
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from urllib.parse import quote
+import json
+import random
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent.joinpath("src")))
+
+import hitomi  # noqa: E402
+from benchmark_records import get_deep_size  # noqa: E402
+
+# Compares the seen doujin kept as a set of urls, and dumped to json with the config,
+# with a set of gallery ids saved in the search state as they are added
+
+
+def generate_urls(count: int, seed: int) -> list[str]:
+    """
+    Gallery urls with percent-encoded japanese titles, like the ones in the site
+    """
+    rng = random.Random(seed)
+    gallery_ids = rng.sample(range(1, count * 3), count)
+    return [f"https://hitomi.la/doujinshi/{quote(chr(0x3041 + rng.randrange(80)) * rng.randint(8, 20))}"
+            f"-日本語-{gallery_id}.html" for gallery_id in gallery_ids]
+
+
+def measure_time(task) -> float:
+    start = perf_counter()
+    task()
+    return perf_counter() - start
+
+
+def measure_lookups(seen, items: list) -> float:
+    """
+    Nanoseconds per lookup
+    """
+    seconds = measure_time(lambda: sum(1 for item in items if item in seen))
+    return seconds / len(items) * 1e9
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark the seen doujin set")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    urls = generate_urls(args.count, args.seed)
+    print(f"{len(urls)} seen doujin, {sum(map(len, urls)) / len(urls):.0f} characters per url")
+    # Half seen, half new
+    lookups = urls[:50_000] + [url.replace(".html", "0.html") for url in urls[:50_000]]
+
+    url_set = set(urls)
+    gallery_set = hitomi.GallerySet(urls)
+    url_set_size = get_deep_size(url_set)
+    print(f"url set: {url_set_size / 2**20:.1f} MB")
+    size = get_deep_size(gallery_set)
+    print(f"gallery set: {size / 2**20:.1f} MB ({url_set_size / size:.0f}x smaller)")
+
+    print(f"url set lookup: {measure_lookups(url_set, lookups):.0f} ns")
+    print(f"gallery set lookup: {measure_lookups(gallery_set, lookups):.0f} ns")
+    id_lookups = [hitomi.to_gallery_id(url) for url in lookups]
+    print(f"gallery set lookup by id: {measure_lookups(gallery_set, id_lookups):.0f} ns")
+
+    with TemporaryDirectory() as directory:
+        def dump_urls():
+            # Same as the config did on every dump
+            with open(Path(directory, "config.json"), "w", encoding="utf-8") as f:
+                json.dump({"seen_doujinshi": sorted(url_set)}, f, ensure_ascii=False, indent=4)
+        print(f"url set dump to json: {measure_time(dump_urls) * 1000:.0f} ms")
+
+        state = hitomi.SearchState(Path(directory, "state.sqlite"))
+        config = hitomi.Config()
+        state.load(config)
+        print(f"gallery ids first saved: {measure_time(lambda: config.seen_doujinshi.update(gallery_set)) * 1000:.0f} ms")
+        new_urls = [url.replace(".html", "0.html") for url in urls[:1000]]
+
+        def add_new_urls():
+            for url in new_urls:
+                config.seen_doujinshi.add(url)
+        print(f"gallery id saved when seen: {measure_time(add_new_urls) / len(new_urls) * 1e6:.0f} us")
+        print(f"Same ids: {sorted(config.seen_doujinshi) == sorted(hitomi.GallerySet(urls + new_urls))}")
+        state.close()
@@ -0,0 +1,25 @@
+from argparse import ArgumentParser
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Serves a folder that mirrors the paths of the site's gallery data so the
+# 'http' backend can run without the network. Start it and set
+# HITOMI_LTN_URL="http://localhost:8000" in .env
+#
+#   fixtures/
+#       n/index-japanese.nozomi         big-endian 32-bit gallery ids
+#       n/tag/female:big breasts-all.nozomi
+#       n/artist/name-japanese.nozomi
+#       galleries/123456.js             var galleryinfo = {...}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Serve fixture files as the site's gallery data")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    handler = partial(SimpleHTTPRequestHandler, directory=str(args.directory))
+    with ThreadingHTTPServer(("localhost", args.port), handler) as server:
+        print(f"Serving {args.directory} at http://localhost:{args.port}")
+        server.serve_forever()